@@ -12,6 +12,9 @@
 #
 # First, generate the words#.json files as described in README.md
 #
+# The word lists are read through the binary cache of wordCache.py,
+#   which is compiled automatically the first time a list is loaded.
+#
 # (c) 2023 Bradley Knockel
 
 
@@ -20,7 +23,7 @@ from itertools import permutations
 #   so I don't import product from itertools
 # Instead, I do the product myself using a recursive function that loops over permutations.
 
-import json
+from wordCache import load_frequencies
 
 
 # https://stackoverflow.com/a/5419576
@@ -144,15 +147,13 @@ for i in range(len(greenMaskAll)):   # check against structure of blank
 
 
 # load first word list
-with open('words' + str(n1) + '.json') as f:
-  data1 = json.load(f)
+data1 = load_frequencies('words' + str(n1) + '.json', n1)
 
 # load 2nd word list
 if n1==n2:
   data2 = data1
 else:
-  with open('words' + str(n2) + '.json') as f:
-    data2 = json.load(f)
+  data2 = load_frequencies('words' + str(n2) + '.json', n2)
 
 
 
@@ -20,6 +20,10 @@
 #
 # First, generate the words#.json files as described in README.md
 #
+# The word lists are read through the binary cache of wordCache.py,
+#   which is compiled automatically the first time a list is loaded.
+# The word lists are then reduced by wordPrep.py, which also caches the reduced lists.
+#
 # (c) 2023 Bradley Knockel
 
 
@@ -31,7 +35,60 @@ n1 = 4
 n2 = 4
 
 
+
+# To reduce the word lists (see wordPrep.py)...
+freqCutoffs = {}        # {word length: frequency cutoff}, such as {3: 1E-5, 4: 1E-6}
+blocklistFile = ""      # a file of words to never use
+allowlistFile = ""      # a file of words to always use (even if they would be removed)
+forbiddenLetters = ""   # for example, "jqxz"
+maxSameLetter = 0       # if not 0, words with more than this many of any one letter are removed
+
+
+
+# To be able to continue a long search after an interruption, set checkpointFile.
+# Every checkpointSeconds, the starting pairs that have been completely searched
+#   (and the waffles already printed for starting pairs that have not) are saved to it.
+# Rerun with resume = True to skip the completed work.
+# A checkpoint is also saved when the search is stopped with Ctrl+C or is terminated.
+checkpointFile = ""     # for example, "solidWaffleGen.checkpoint.json"
+checkpointSeconds = 60
+resume = False
+
+
+
+# To write the waffles to a file instead of printing them, set outputFile.
+# Each line of the file is the words of one waffle (see waffleWriter.py).
+# End the name with .jsonl for JSON lines and/or with .gz to compress the file.
+outputFile = ""         # for example, "solidWaffles.txt.gz"
+
+
+
+# To only find waffles that have certain words, list them in requiredWords.
+#   To require a word to be in a certain place, follow it with the place, such as "crane h0",
+#   where h0 is the top horizontal word (h1 is the next one down) and v0 is the leftmost vertical word.
+# To only find waffles that have certain letters, set startingGrid to the rows of the waffle
+#   with '.' for letters that can be anything, such as...
+#   startingGrid = """
+#     c...
+#     ..z.
+#     ....
+#     .e.."""
+# The required words do not need to be in the word lists.
+# The required words and letters are placed first, then the remaining word with the fewest
+#   possible words is always placed next (as with dynamicOrder in waffleGen.py).
+requiredWords = []
+startingGrid = ""
+
+
+
 import json
+import os
+import signal
+import time
+from itertools import permutations
+
+from wordPrep import prepare_words, words_hash
+from waffleWriter import WaffleWriter
 
 #################################################
 ###### prepare
@@ -50,44 +107,208 @@ n1d = 2*n1   # useful
 n2d = 2*n2
 
 
+# for massive speedup, precompute some dictionaries
+
+# The keys are the first few letters (as ASCII codes) of a word,
+#   combined into one integer as the digits of a base-128 number.
+#   For example, the key of the first 2 letters of "crane" is 128*ord('c') + ord('r').
+# The search then computes keys with arithmetic instead of making strings.
+
+def make_index(data, max_len):
+  index = {}
+
+  for word in data:
+    key = 0
+    for k in range(max_len):
+      key = key*128 + ord(word[k])
+      index.setdefault(key, []).append(word)
+
+  return index
+
+
+# Load and reduce the word lists, and make their dictionaries.
+# The results are cached by wordPrep.py, so rerunning with the same settings is fast.
+
+reduction = dict(blocklistFile=blocklistFile, allowlistFile=allowlistFile,
+                 forbiddenLetters=forbiddenLetters, maxSameLetter=maxSameLetter)
+
 # load first word list
-with open('words' + str(n1) + '.json') as f:
-  data1 = json.load(f)
+data1, index1 = prepare_words('words' + str(n1) + '.json', n1, make_index, freqCutoffs.get(n1, 0), **reduction)
 
 # load 2nd word list
 if n1==n2:
   data2 = data1
+  index2 = index1
 else:
-  with open('words' + str(n2) + '.json') as f:
-    data2 = json.load(f)
+  data2, index2 = prepare_words('words' + str(n2) + '.json', n2, make_index, freqCutoffs.get(n2, 0), **reduction)
 
 
 print("\n  Word list 1 is", len(data1), str(n1) + "-letter words.")
 print("  Word list 2 is", len(data2), str(n2) + "-letter words.")
 
+#print(index1)
+#exit()
 
 
-# for massive speedup, precompute some dictionaries
+# For the search, each word is a number (its index in data1 or data2), and the letters of the
+#   words are matrices of ASCII codes (bytes), where word i's letter k is letters1[i*n1 + k].
+letters1 = "".join(data1).encode("ascii")
+letters2 = "".join(data2).encode("ascii")
+wordNumber1 = {word: i for i, word in enumerate(data1)}
+if n1==n2:
+  wordNumber2 = wordNumber1
+else:
+  wordNumber2 = {word: i for i, word in enumerate(data2)}
 
-def make_index(data, max_len):
-  index = {}
 
-  for word in data:
-    for k in range(1, max_len + 1):
-      key = word[:k]
-      index.setdefault(key, []).append(word)
 
-  return index
+#################################################
+###### optionally require certain words or letters
+#################################################
 
-index1 = make_index(data1, n1)
+# This works the same as in waffleGen.py, except that every letter is shared.
+# Each way of putting the required words in places is a placement.
+# For every placement, the words that can go in each place are put in a subset index:
+#   a required word is the only word for its place, and the other places have the words
+#   that have the letters of startingGrid.
+# The placements are (horIndexes, verIndexes, [(index, letter) that the top word must have],
+#   [(index, letter) that the left word must have]), where the letters are the first letters
+#   of the other required words.
+# Then only the starting pairs that fit a placement are searched (see starting_pairs()).
 
-if n1 == n2:
-  index2 = index1
-else:
-  index2 = make_index(data2, n2)
+seeded = bool(requiredWords or startingGrid.strip())
 
-#print(index1)
-#exit()
+
+# The numbers of the words that fit any set of letters.
+#   Digit k (in base 128) of a key is the letter (as an ASCII code) at index k of the word,
+#   or 0 if that letter is not known yet, so the key of all the words is 0.
+#   Each key is only computed the first time it is needed (from the key without its last letter).
+#   letters and length are letters1 and n1 or letters2 and n2.
+
+def make_subset_index(numbers):
+  return {0: list(numbers)}
+
+def subset_lookup(subsetIndex, key, letters, length):
+  words = subsetIndex.get(key)
+  if words is None:
+    k = (key.bit_length() - 1) // 7   # the last known letter
+    letter = key >> 7*k
+    words = [w for w in subset_lookup(subsetIndex, key & ((1 << 7*k) - 1), letters, length) if letters[w*length + k]==letter]
+    subsetIndex[key] = words
+  return words
+
+
+# for each place, the letters of startingGrid (or '.' for any letter)
+def parse_grid():
+
+  if not startingGrid.strip():
+    return ['.'*n1] * n2, ['.'*n2] * n1
+
+  gridRows = [row.replace(" ", "") for row in startingGrid.split("\n") if row.strip()]
+  if len(gridRows) != n2 or any(len(row) != n1 for row in gridRows):
+    print("  Error: startingGrid is not the shape of the waffle!")
+    exit()
+
+  return gridRows, ["".join(row[v] for row in gridRows) for v in range(n1)]
+
+
+def fits(word, pattern):
+  return all(p == '.' or p == letter for p, letter in zip(pattern, word))
+
+
+def make_placements():
+
+  horPatterns, verPatterns = parse_grid()
+
+  subsetIndex1 = make_subset_index(range(len(data1)))
+  subsetIndex2 = subsetIndex1 if n1 == n2 else make_subset_index(range(len(data2)))
+
+  # the indexes of places without a required word
+  horShared = [subsetIndex1 if set(pattern) == {'.'} else make_subset_index([i for i, word in enumerate(data1) if fits(word, pattern)]) for pattern in horPatterns]
+  verShared = [subsetIndex2 if set(pattern) == {'.'} else make_subset_index([i for i, word in enumerate(data2) if fits(word, pattern)]) for pattern in verPatterns]
+
+  # places are ('h', h) or ('v', v)
+  places = [('h', h) for h in range(n2)] + [('v', v) for v in range(n1)]
+  length = {'h': n1, 'v': n2}
+
+  pinned = {}
+  unpinned = []
+  for entry in dict.fromkeys(requiredWords):   # without repeats
+    word, *place = entry.split()
+    if place:
+      place = (place[0][0], int(place[0][1:]))
+      if place not in places or len(word) != length[place[0]]:
+        print("  Error: " + word + " cannot go in " + entry.split()[1] + "!")
+        exit()
+      pinned[place] = word
+    else:
+      if len(word) not in (n1, n2):
+        print("  Error: " + word + " is not " + str(n1) + " or " + str(n2) + " letters!")
+        exit()
+      unpinned.append(word)
+
+  placements = []
+  for unpinnedPlaces in permutations([place for place in places if place not in pinned], len(unpinned)):
+
+    placed = dict(pinned)
+    placed.update(zip(unpinnedPlaces, unpinned))
+
+    # each word must fit its place, startingGrid, and the other required words
+    if any(len(word) != length[kind] for (kind, _), word in placed.items()):
+      continue
+    if any(not fits(word, (horPatterns if kind == 'h' else verPatterns)[i]) for (kind, i), word in placed.items()):
+      continue
+    if any(('v', v) in placed and placed[('v', v)][h] != word[v] for (kind, h), word in placed.items() if kind == 'h' for v in range(n1)):
+      continue
+
+    horIndexes = [make_subset_index([required_number(placed[('h', h)])]) if ('h', h) in placed else horShared[h] for h in range(n2)]
+    verIndexes = [make_subset_index([required_number(placed[('v', v)])]) if ('v', v) in placed else verShared[v] for v in range(n1)]
+    topLetters = [(v, word[0]) for (kind, v), word in placed.items() if kind == 'v' and v > 0]
+    leftLetters = [(h, word[0]) for (kind, h), word in placed.items() if kind == 'h' and h > 0]
+    placements.append((horIndexes, verIndexes, topLetters, leftLetters))
+
+  print("  There are", len(placements), "ways to place the required words.")
+  return placements, not pinned and not startingGrid.strip()
+
+
+# The number of a required word, which is added to the end of its word list if it is not in it
+#   (so it is only used where it is required).
+# letters1 and letters2 are made again after all required words have numbers.
+def required_number(word):
+
+  data, wordNumber = (data1, wordNumber1) if len(word) == n1 else (data2, wordNumber2)
+  if word not in wordNumber:
+    wordNumber[word] = len(data)
+    data.append(word)
+  return wordNumber[word]
+
+
+# returns {(w1, w2): [(horIndexes, verIndexes) of each placement that the starting pair fits]}
+def make_pair_placements(placements):
+
+  pairPlacements = {}
+  for horIndexes, verIndexes, topLetters, leftLetters in placements:
+
+    leftWordsByLetter = {}
+    for w2 in [data2[i] for i in verIndexes[0][0]]:
+      if all(w2[k] == letter for k, letter in leftLetters):
+        leftWordsByLetter.setdefault(w2[0], []).append(w2)
+
+    for w1 in [data1[i] for i in horIndexes[0][0]]:
+      if all(w1[k] == letter for k, letter in topLetters):
+        for w2 in leftWordsByLetter.get(w1[0], []):
+          pairPlacements.setdefault((w1, w2), []).append((horIndexes, verIndexes))
+
+  return pairPlacements
+
+
+skipTransposes = True
+
+if seeded:
+  placements, skipTransposes = make_placements()
+  letters1 = "".join(data1).encode("ascii")
+  letters2 = "".join(data2).encode("ascii")
+  pairPlacements = make_pair_placements(placements)
 
 
 
@@ -103,62 +324,282 @@ else:
 
 
 
+# The word numbers of the waffle so far are in slots[] (which is never copied),
+#   where slots[n] is word n (and is -1 for an empty string).
+slots = [-1] * n2d
+
+
 # recursive function to handle the variable number of for loops (number of loops depends on nl)
-def loop_recursive(w, n, nHalf):
+def loop_recursive(n, nHalf):
 
   if n < n2d:
 
-    if n < n1d:
-      temp1 = "".join(w[i][nHalf] for i in range(1, n, 2))
-    else:
-      temp1 = "".join(w[i][nHalf] for i in range(1, n1d, 2))
+    key = 0
+    for i in range(1, min(n, n1d), 2):
+      key = key*128 + letters2[slots[i]*n2 + nHalf]
 
-    for w1 in index1.get(temp1, []):   # horizontal word
+    for w1 in index1.get_numbers(key):   # horizontal word
+      slots[n] = w1
 
       if n < n1d:   # if there are still more vertical words to be placed
 
-        nn = n + 1
-        nnHalf = nHalf + 1
-        ww = w + [w1]
+        key = 0
+        for i in range(0, n + 1, 2):
+          key = key*128 + letters1[slots[i]*n1 + nHalf]
 
-        temp2 = "".join(ww[i][nHalf] for i in range(0, nn, 2))
-
-        for w2 in index2.get(temp2, []):    # vertical word
-          loop_recursive(ww + [w2], nn + 1, nnHalf)
+        for w2 in index2.get_numbers(key):    # vertical word
+          slots[n + 1] = w2
+          loop_recursive(n + 2, nHalf + 1)
 
       else:
 
-        loop_recursive(w + [w1, ''], n + 2, nHalf + 1)
+        loop_recursive(n + 2, nHalf + 1)
+
 
+  else:     # slots now contains all the words in the waffle
 
-  else:     # w now contains all the words in the waffle
+      w = [data1[slots[i]] if not i&1 else data2[slots[i]] if i < n1d else '' for i in range(n2d)]
 
       # check for repeated words
       realWords = [word for word in w if word]   # removes any placeholder empty strings ''
       if len(realWords) != len(set(realWords)):
         return
 
-      waffle = '\n'.join([w[i] for i in range(0, n2d, 2)])
+      emit(w)
+
+
+
+# When seeded, the remaining word with the fewest possible words is placed next.
+#   hor[h] is the number of horizontal word h (from the top) and ver[v] is the number of
+#   vertical word v (from the left), with -1 for words not yet placed (the lists are never copied).
+#   Horizontal word h and vertical word v share the letter at index v of h and index h of v,
+#   which is digit v of the subset key of h and digit h of the subset key of v.
+# w is made (as strings in the usual alternating order) only when a waffle is found.
+hor = [-1] * n2
+ver = [-1] * n1
+
+def loop_recursive_seeded(numPlaced):
+
+  if numPlaced < n1 + n2:
+
+    # find the remaining word with the fewest possible words
+    best = None
+    for h in range(n2):
+      if hor[h] < 0:
+        key = 0
+        for v in range(n1):
+          if ver[v] >= 0:
+            key |= letters2[ver[v]*n2 + h] << 7*v
+        words = subset_lookup(horIndexes[h], key, letters1, n1)
+        if not words:
+          return
+        if best is None or len(words) < len(best):
+          best, places, slot = words, hor, h
+    for v in range(n1):
+      if ver[v] < 0:
+        key = 0
+        for h in range(n2):
+          if hor[h] >= 0:
+            key |= letters1[hor[h]*n1 + v] << 7*h
+        words = subset_lookup(verIndexes[v], key, letters2, n2)
+        if not words:
+          return
+        if best is None or len(words) < len(best):
+          best, places, slot = words, ver, v
+
+    for word in best:
+      places[slot] = word
+      loop_recursive_seeded(numPlaced + 1)
+    places[slot] = -1
+
+  else:
+
+    w = [data1[hor[i//2]] if not i&1 else data2[ver[i//2]] if i//2 < n1 else '' for i in range(n2d)]
 
-      print()
-      print(waffle)
-      print("      " + " ".join([word for word in w]))
-      print()
+    # check for repeated words
+    realWords = [word for word in w if word]   # removes any placeholder empty strings ''
+    if len(realWords) != len(set(realWords)):
+      return
+
+    emit(w)
+
+
+
+# searches every waffle starting with the top word w1 and the left word w2
+def search_pair(w1, w2):
+  global horIndexes, verIndexes
+
+  if seeded:
+    hor[0] = wordNumber1[w1]
+    ver[0] = wordNumber2[w2]
+    for horIndexes, verIndexes in pairPlacements[w1, w2]:
+      loop_recursive_seeded(2)
+  else:
+    slots[0] = wordNumber1[w1]
+    slots[1] = wordNumber2[w2]
+    loop_recursive(2, 1)
+
+
+
+def print_waffle(w):
+
+  waffle = '\n'.join([w[i] for i in range(0, n2d, 2)])
+
+  print()
+  print(waffle)
+  print("      " + " ".join([word for word in w]))
+  print()
+
+emit = print_waffle
+
+
+# what is done with each new waffle (print_waffle() or, if using outputFile, writer.write())
+output = print_waffle
+writer = None
 
 
 
 # prevent symmetrically identical puzzles by doing the first two words here to enforce w1 < w2,
 #   but only for square waffles
+#   (and only if the required words and letters are the same for the transpose)
 
-for w1 in data1:
-  print("  Now starting with " + w1 + " as the first word")
+def starting_pairs():
 
-  if n1==n2:   # square waffles
-    for w2 in data2:
-      if w2[0]==w1[0] and w1 < w2:
-        loop_recursive([w1,w2], 2, 1)
-  else:
-    for w2 in data2:
-      if w2[0]==w1[0]:
-        loop_recursive([w1,w2], 2, 1)
+  if seeded:
+    for w1, w2 in pairPlacements:
+      if n1!=n2 or not skipTransposes or w1 < w2:
+        yield w1, w2
+    return
+
+  for w1 in data1:
+    print("  Now starting with " + w1 + " as the first word")
+
+    if n1==n2:   # square waffles
+      for w2 in data2:
+        if w2[0]==w1[0] and w1 < w2:
+          yield w1, w2
+    else:
+      for w2 in data2:
+        if w2[0]==w1[0]:
+          yield w1, w2
+
+
+
+#################################################
+###### optionally save progress to a checkpoint file
+#################################################
+
+# This works the same as in waffleGen.py.
+# A starting pair (w1, w2) is done once every waffle starting with it has been printed.
+# The waffles printed for a starting pair that is not done are remembered so that,
+#   after resuming, that pair can be searched again without printing them twice.
+
+donePairs = set()
+printedWaffles = {}   # {(w1, w2): set of printed waffles} for starting pairs that are not done
+
+# a checkpoint only works for the same search of the same word lists
+checkpointSettings = [n1, n2, words_hash(data1), words_hash(data2)]
+if seeded:
+  checkpointSettings.append([requiredWords, startingGrid])
+
+lastSave = time.time()
+
+
+def save_checkpoint():
+  global lastSave
+
+  # the waffles must be in outputFile before the checkpoint says that they were found
+  if writer:
+    writer.flush()
+
+  checkpoint = {
+    "settings": checkpointSettings,
+    "done": sorted(donePairs),
+    "printed": [[w1, w2, sorted(waffles)] for (w1, w2), waffles in printedWaffles.items()],
+  }
+
+  # write then rename so that an interruption while saving cannot ruin the old checkpoint
+  with open(checkpointFile + ".tmp", "w") as f:
+    json.dump(checkpoint, f)
+  os.replace(checkpointFile + ".tmp", checkpointFile)
+
+  lastSave = time.time()
+
+
+def load_checkpoint():
+
+  with open(checkpointFile) as f:
+    checkpoint = json.load(f)
+
+  if checkpoint["settings"] != checkpointSettings:
+    print("  Error: " + checkpointFile + " is from a search with different settings!")
+    exit()
+
+  donePairs.update(tuple(pair) for pair in checkpoint["done"])
+  for w1, w2, waffles in checkpoint["printed"]:
+    printedWaffles[(w1, w2)] = set(waffles)
+
+  print("  Resuming after", len(donePairs), "completed starting pairs.")
+
+
+# print the waffle unless it was already printed before resuming
+def print_new_waffle(w):
+
+  key = " ".join(w)
+  printed = printedWaffles.setdefault((w[0], w[1]), set())
+  if key in printed:
+    return
+  printed.add(key)
+
+  output(w)
+
+
+def pair_done(pair):
+  donePairs.add(pair)
+  printedWaffles.pop(pair, None)
+
+  if checkpointFile and time.time() - lastSave > checkpointSeconds:
+    save_checkpoint()
+
+
+# Stopping the search with Ctrl+C or with a termination signal (like when a
+#   batch job is preempted) saves a checkpoint before exiting.
+def stop(signalNumber, frame):
+  raise KeyboardInterrupt
+
+
+
+resuming = checkpointFile and resume and os.path.exists(checkpointFile)
+if resuming:
+  load_checkpoint()
+
+if outputFile:
+  writer = WaffleWriter(outputFile, n1==n2, append=resuming)
+  output = emit = writer.write
+
+if checkpointFile:
+  signal.signal(signal.SIGTERM, stop)
+  emit = print_new_waffle
+
+try:
+
+  for w1, w2 in starting_pairs():
+    if (w1, w2) in donePairs:
+      continue
+    search_pair(w1, w2)
+    pair_done((w1, w2))
+
+except KeyboardInterrupt:
+  if checkpointFile:
+    save_checkpoint()
+    print("\n  Stopped. Progress was saved to " + checkpointFile)
+  if writer:
+    writer.close()
+  exit()
+
+if checkpointFile:
+  save_checkpoint()
 
+if writer:
+  writer.close()
+  print("  Wrote", writer.count, "waffles to " + outputFile)
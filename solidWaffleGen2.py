@@ -5,6 +5,9 @@
 #
 # First, generate the words#.json files as described in README.md
 #
+# The word lists are read through the binary cache of wordCache.py,
+#   which is compiled automatically the first time a list is loaded.
+#
 # Enter the solution in the first section of the code.
 # To change the waffle-making strategy, edit the final "main code" section.
 # Keep rerunning the code until you get a puzzle you like!
@@ -19,7 +22,7 @@ from itertools import permutations
 
 from random import shuffle, sample
 
-import json
+from wordCache import load_frequencies
 
 
 # https://stackoverflow.com/a/5419576
@@ -109,15 +112,13 @@ for i in range(len(sol)):   # check against structure of blank
 
 
 # load first word list
-with open('words' + str(n1) + '.json') as f:
-  data1 = json.load(f)
+data1 = load_frequencies('words' + str(n1) + '.json', n1)
 
 # load 2nd word list
 if n1==n2:
   data2 = data1
 else:
-  with open('words' + str(n2) + '.json') as f:
-    data2 = json.load(f)
+  data2 = load_frequencies('words' + str(n2) + '.json', n2)
 
 
 
@@ -256,11 +257,13 @@ def colorPuzzle(puzzle):
 
 
 #################################################
-###### solver function, which returns number of solutions
+###### solver functions, which return number of solutions
 #################################################
 
 
-def count_solutions(greenMaskAll, lettersAll):
+# If limit is not 0, the search stops as soon as limit solutions are found,
+#   so the returned count is at most limit.
+def count_solutions(greenMaskAll, lettersAll, limit=0):
   global solCount    # needs to be global for loop_recursive()
 
   wordListAll = []
@@ -423,6 +426,8 @@ def count_solutions(greenMaskAll, lettersAll):
         for _,word in wordListAllNew[n]:
           if word[0:nHalf2] == temp :
             loop_recursive(w + [word], n + 1)
+            if limit and solCount >= limit:   # stop early
+              return
 
       else:
         loop_recursive(w + [''], n + 1)
@@ -448,6 +453,13 @@ def count_solutions(greenMaskAll, lettersAll):
 
 
 
+# Only says whether a puzzle has 0 solutions, 1 solution, or many solutions (returns 2),
+#   which is all that making a puzzle needs to know and is much faster than counting them all.
+def solution_status(greenMaskAll, lettersAll):
+  return count_solutions(greenMaskAll, lettersAll, 2)
+
+
+
 
 #################################################
 ###### define function get_optimal_swaps(), which counts optimal swaps
@@ -816,7 +828,7 @@ def strategy3():
         j += 1
 
     greenMaskAll, lettersAll, trivial = colorPuzzle(puzzle)
-    solCount = count_solutions(greenMaskAll, lettersAll)
+    solCount = solution_status(greenMaskAll, lettersAll)
     swaps = get_optimal_swaps(greenMaskAll, lettersAll)
 
     print(".")
@@ -847,9 +859,9 @@ while trivial or solCount!=1:
   print("  Puzzle has a trivial move?", trivial)
   print()
 
-  solCount = count_solutions(greenMaskAll, lettersAll)
+  solCount = solution_status(greenMaskAll, lettersAll)
 
-  print("  solution count =", solCount)
+  print("  solution count =", solCount if solCount < 2 else "2 or more")
   print()
 
   swaps = get_optimal_swaps(greenMaskAll, lettersAll)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3.11
+#
+# Solve many Waffle puzzles from a file using waffleSolver.py.
+#
+# Usage...
+#   python3 waffleBatch.py puzzles.jsonl results.jsonl
+#   python3 waffleBatch.py puzzles.jsonl > results.jsonl
+# Use - as the input file to read from standard input.
+#
+# Every line of the input file is a JSON object with greenMaskAll and lettersAll
+#   in the same format as waffle.py, such as...
+#   {"id": 17, "greenMaskAll": "w...f\nr . r\n.....\n. e .\n....e", "lettersAll": "wITzf\nr R r\nheITN\no e h\nfRNse"}
+#   (blank lines are skipped, and "id" is optional).
+# Every line of the output is a JSON object with the input's line number and id,
+#   then waffleSolver.py's "solutions", "solution", "swaps", and "swapList",
+#   plus "seconds" (the time taken to solve the puzzle).
+# If a puzzle cannot be read or is invalid, its output line has "error" instead.
+#
+# The input is read one line at a time, and each result is written as soon as it is found,
+#   so the input file can be any size.
+#
+# Set numProcesses to solve puzzles in parallel. The word lists of preloadLengths are loaded
+#   before the worker processes start, so (on systems that fork) the workers share them
+#   instead of each loading its own copy. Puzzles are handed out in chunks of chunkSize,
+#   and the results are still written in the order of the input file.
+#
+# (c) 2023 Bradley Knockel
+
+
+import json
+import signal
+import sys
+import time
+from itertools import islice
+
+from waffleSolver import Solver
+
+
+wordFile = 'words_alpha.txt'
+frequencyFile = 'freq_map.json'   # used for 5-letter words (set to '' to use wordFile)
+
+numProcesses = 1
+chunkSize = 16             # puzzles sent to a worker at a time
+preloadLengths = [5, 7]    # other word lengths are loaded by each worker when first needed
+
+solver = None
+
+
+
+# yields (line number, puzzle) for every non-blank line, where puzzle is the parsed JSON
+#   (or the error message if the line is not valid JSON)
+def read_puzzles(f):
+  for lineNum, line in enumerate(f, 1):
+    if not line.strip():
+      continue
+    try:
+      puzzle = json.loads(line)
+    except ValueError as e:
+      puzzle = str(e)
+    yield lineNum, puzzle
+
+
+
+# returns the output dictionary for one puzzle
+def solve_puzzle(solver, lineNum, puzzle):
+
+  output = {"line": lineNum}
+  if isinstance(puzzle, dict) and "id" in puzzle:
+    output["id"] = puzzle["id"]
+
+  start = time.perf_counter()
+  try:
+    if not isinstance(puzzle, dict):
+      raise ValueError(puzzle if isinstance(puzzle, str) else "each line must be a JSON object")
+    if "greenMaskAll" not in puzzle or "lettersAll" not in puzzle:
+      raise ValueError("greenMaskAll and lettersAll are required")
+    result = solver.solve(puzzle["greenMaskAll"], puzzle["lettersAll"])
+  except ValueError as e:
+    output["error"] = str(e)
+    return output
+  except Exception as e:   # a bug should not stop the other puzzles from being solved
+    output["error"] = type(e).__name__ + ": " + str(e)
+    return output
+
+  output["solutions"] = result["solutions"]
+  output["solution"] = result["solution"]
+  output["swaps"] = result["swaps"]
+  output["swapList"] = result["swapList"]
+  output["seconds"] = round(time.perf_counter() - start, 6)
+  return output
+
+
+
+# Workers that were forked already have the solver and its word lists.
+# Workers leave stopping to the main process.
+def init_worker():
+  global solver
+
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  if solver is None:
+    solver = Solver(wordFile, frequencyFile)
+
+
+def solve_chunk(chunk):
+  return [solve_puzzle(solver, lineNum, puzzle) for lineNum, puzzle in chunk]
+
+
+# yields the outputs in the order of the input
+def solve_all(puzzles):
+
+  if numProcesses == 1:
+    for lineNum, puzzle in puzzles:
+      yield solve_puzzle(solver, lineNum, puzzle)
+    return
+
+  from multiprocessing import Pool
+  from threading import Semaphore
+
+  # Pool.imap() would read the whole input right away, so only a few chunks per worker
+  #   are read ahead of the results being written.
+  # A chunk is read once the window has room for it, and a chunk's results being written makes room,
+  #   so a slow puzzle only holds up the writing (the other workers keep solving the chunks after it).
+  readAhead = 4 * numProcesses
+  window = Semaphore(readAhead)
+  stopped = False
+
+  def read_chunks():   # runs in the thread of the pool that hands out the chunks
+    for chunk in iter(lambda: list(islice(puzzles, chunkSize)), []):
+      window.acquire()
+      if stopped:
+        return
+      yield chunk
+
+  with Pool(numProcesses, init_worker) as pool:
+    try:
+      for outputs in pool.imap(solve_chunk, read_chunks()):
+        window.release()
+        yield from outputs
+    finally:
+      stopped = True
+      window.release(readAhead)   # so that read_chunks() is not left waiting
+
+
+
+def solve_file(inFile, outFile):
+  global solver
+
+  solver = Solver(wordFile, frequencyFile)
+  if numProcesses != 1:
+    for length in preloadLengths:
+      solver.word_list(length)
+
+  count = 0
+  errors = 0
+  start = time.perf_counter()
+
+  for output in solve_all(read_puzzles(inFile)):
+    outFile.write(json.dumps(output) + "\n")
+    outFile.flush()
+
+    count += 1
+    if "error" in output:
+      errors += 1
+
+  print("  Solved", count - errors, "puzzles with", errors, "errors in",
+        round(time.perf_counter() - start, 2), "seconds", file=sys.stderr)
+
+
+
+if __name__ == "__main__":
+
+  if len(sys.argv) not in (2, 3):
+    print("  Usage: python3 waffleBatch.py puzzles.jsonl [results.jsonl]")
+    exit()
+
+  inFile = sys.stdin if sys.argv[1] == "-" else open(sys.argv[1])
+  outFile = open(sys.argv[2], "w") if len(sys.argv) == 3 else sys.stdout
+
+  with inFile, outFile:
+    solve_file(inFile, outFile)
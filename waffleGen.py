@@ -28,9 +28,23 @@
 #   and that you want to use its frequency data to reduce
 #   the size of the word list.
 #
+# The word lists are read through the binary cache of wordCache.py,
+#   which is compiled automatically the first time a list is loaded.
+# The word lists are then reduced by wordPrep.py, which also caches the reduced lists.
+#
 # (c) 2023 Bradley Knockel
 
 
+import json
+import os
+import signal
+import time
+from itertools import permutations
+
+from wordPrep import prepare_words, words_hash
+from waffleWriter import WaffleWriter
+
+
 
 # Set number of letters per word along each dimension.
 # Each must be an odd number greater than 1.
@@ -54,6 +68,74 @@ wordListFile2 = "wordsCommon7.txt"
 
 
 
+# To reduce the word lists more (see wordPrep.py)...
+freqCutoffs = {}        # {word length: cutoff} for word-list files with frequencies (such as {7: 1E-6} for words7.json)
+blocklistFile = ""      # a file of words to never use
+allowlistFile = ""      # a file of words to always use (even if they would be removed)
+forbiddenLetters = ""   # for example, "jqxz"
+maxSameLetter = 0       # if not 0, words with more than this many of any one letter are removed
+
+
+
+# To write the waffles to a file instead of printing them, set outputFile.
+# Each line of the file is the words of one waffle (see waffleWriter.py).
+# End the name with .jsonl for JSON lines and/or with .gz to compress the file.
+outputFile = ""         # for example, "waffles.txt.gz"
+
+
+
+# Set to more than 1 to search using several CPU cores.
+numProcesses = 1
+shardsPerProcess = 64   # more shards balance the work better but have more overhead
+
+
+
+# To be able to continue a long search after an interruption, set checkpointFile.
+# Every checkpointSeconds, the starting pairs that have been completely searched
+#   (and the waffles already printed for starting pairs that have not) are saved to it.
+# Rerun with resume = True to skip the completed work.
+# A checkpoint is also saved when the search is stopped with Ctrl+C or is terminated.
+checkpointFile = ""     # for example, "waffleGen.checkpoint.json"
+checkpointSeconds = 60
+resume = False
+
+
+
+# The fixed order places words alternating between horizontal and vertical from the top left.
+# Set dynamicOrder = True to instead always place next the remaining word (horizontal or vertical)
+#   that has the fewest possible words given the letters it already shares with placed words.
+dynamicOrder = False
+
+# Set benchmark = True to time searching every starting pair with the fixed order
+#   and with the dynamic order (nothing is printed but the number of waffles and the times).
+benchmark = False
+
+
+# Set countOnly = True to not print any waffles, but instead print the total number of waffles
+#   (and the estimate of it from README.md), the number of waffles for each first word,
+#   and the number of nodes (ways of placing some of the words) for each number of words placed.
+countOnly = False
+
+
+
+# To only find waffles that have certain words, list them in requiredWords.
+#   To require a word to be in a certain place, follow it with the place, such as "crane h0",
+#   where h0 is the top horizontal word (h1 is the next one down) and v0 is the leftmost vertical word.
+# To only find waffles that have certain letters, set startingGrid to the rows of the waffle
+#   (as they are printed) with '.' for letters that can be anything, such as...
+#   startingGrid = """
+#     c....
+#     . . z
+#     .....
+#     . e .
+#     ....."""
+# The required words do not need to be in the word lists.
+# The required words and letters are placed first, and the dynamic order is then always used.
+requiredWords = []
+startingGrid = ""
+
+
+
 
 #################################################
 ###### prepare
@@ -69,90 +151,222 @@ if n1 < 3 or not n1&1 or n2 < 3 or not n2&1:
 
 
 n1p = n1+1   # useful
+numHor = n2//2 + 1   # number of horizontal words
+numVer = n1//2 + 1   # number of vertical words
+
+
+# for massive speedup, precompute some dictionaries
 
+# The keys are the letters (as ASCII codes) at the first few shared locations of a word,
+#   combined into one integer as the digits of a base-128 number.
+#   For example, the key of the first 2 shared letters of "crane" is 128*ord('c') + ord('a').
+# The search then computes keys with arithmetic instead of making tuples or strings.
+
+def make_index(data, max_len):
+  index = {}
+
+  for word in data:
+    key = 0
+    for k in range(0, max_len, 2):
+      key = key*128 + ord(word[k])
+      index.setdefault(key, []).append(word)
+
+  return index
+
+
+# Load and reduce the word lists, and make their dictionaries.
+# The results are cached by wordPrep.py, so rerunning with the same settings is fast.
+
+reduction = dict(blocklistFile=blocklistFile, allowlistFile=allowlistFile,
+                 forbiddenLetters=forbiddenLetters, maxSameLetter=maxSameLetter)
 
 # load first word list
 if n1==5:   # this list is better, but only has 5-letter words
+  data1, index1 = prepare_words('freq_map.json', n1, make_index, freqCutoff, **reduction)
+else:
+  data1, index1 = prepare_words(wordListFile1, n1, make_index, freqCutoffs.get(n1, 0), **reduction)
+
+# load 2nd word list
+if n1==n2:
+  data2 = data1
+  index2 = index1
+elif n2==5:   # this list is better, but only has 5-letter words
+  data2, index2 = prepare_words('freq_map.json', n2, make_index, freqCutoff, **reduction)
+else:
+  data2, index2 = prepare_words(wordListFile2, n2, make_index, freqCutoffs.get(n2, 0), **reduction)
+
+
+print("\n  Word list 1 is", len(data1), str(n1) + "-letter words.")
+print("  Word list 2 is", len(data2), str(n2) + "-letter words.")
 
-  import json
-  with open('freq_map.json') as f:
-    dataLong = json.load(f)
+#print(index1)
+#exit()
 
-  data1 = []
-  for word in dataLong:
-    if dataLong[word] > freqCutoff:
-      data1.append(word)
-  del dataLong   # try to free up RAM
 
+# For the search, each word is a number (its index in data1 or data2), and the letters of the
+#   words are matrices of ASCII codes (bytes), where word i's letter k is letters1[i*n1 + k].
+letters1 = "".join(data1).encode("ascii")
+letters2 = "".join(data2).encode("ascii")
+wordNumber1 = {word: i for i, word in enumerate(data1)}
+if n1==n2:
+  wordNumber2 = wordNumber1
 else:
+  wordNumber2 = {word: i for i, word in enumerate(data2)}
 
-  with open(wordListFile1) as f:
-    dataLong = f.read().split()
 
-  data1 = []
-  for word in dataLong:
-    if len(word)==n1:
-      data1.append(word)
-  del dataLong   # try to free up RAM
+# For dynamicOrder, the numbers of the words that fit any set of shared letters (not only the first few).
+#   Digit i (in base 128) of a key is the letter (as an ASCII code) at index 2*i of the word,
+#   or 0 if that letter is not shared yet, so the key of all the words is 0.
+#   Each key is only computed the first time it is needed (from the key without its last letter).
+#   letters and length are letters1 and n1 or letters2 and n2.
 
+def make_subset_index(numbers):
+  return {0: numbers}
 
+def subset_lookup(subsetIndex, key, letters, length):
+  words = subsetIndex.get(key)
+  if words is None:
+    i = (key.bit_length() - 1) // 7   # the last shared letter
+    k = 2*i
+    letter = key >> 7*i
+    words = [w for w in subset_lookup(subsetIndex, key & ((1 << 7*i) - 1), letters, length) if letters[w*length + k]==letter]
+    subsetIndex[key] = words
+  return words
 
-# load 2nd word list
+subsetIndex1 = make_subset_index(list(range(len(data1))))
 if n1==n2:
-  data2 = data1
+  subsetIndex2 = subsetIndex1
 else:
-  if n2==5:   # this list is better, but only has 5-letter words
+  subsetIndex2 = make_subset_index(list(range(len(data2))))
 
-    import json
-    with open('freq_map.json') as f:
-      dataLong = json.load(f)
 
-    data2 = []
-    for word in dataLong:
-      if dataLong[word] > freqCutoff:
-        data2.append(word)
-    del dataLong   # try to free up RAM
 
-  else:
+#################################################
+###### optionally require certain words or letters
+#################################################
 
-    with open(wordListFile2) as f:
-      dataLong = f.read().split()
+# Each way of putting the required words in places is a placement.
+# For every placement, the words that can go in each place are put in a subset index:
+#   a required word is the only word for its place, and the other places have the words
+#   that have the letters of startingGrid.
+# The placements are (horIndexes, verIndexes, [(index, letter) that the top word must have],
+#   [(index, letter) that the left word must have]), where the letters are the first letters
+#   of the other required words.
+# Then only the starting pairs that fit a placement are searched (see starting_pairs()).
 
-    data2 = []
-    for word in dataLong:
-      if len(word)==n2:
-        data2.append(word)
-    del dataLong   # try to free up RAM
-  
+seeded = bool(requiredWords or startingGrid.strip())
 
 
+# for each place, the letters of startingGrid (or '.' for any letter)
+def parse_grid():
 
-print("\n  Word list 1 is", len(data1), str(n1) + "-letter words.")
-print("  Word list 2 is", len(data2), str(n2) + "-letter words.")
+  if not startingGrid.strip():
+    return ['.'*n1] * numHor, ['.'*n2] * numVer
 
+  gridRows = [row.replace(" ", "") for row in startingGrid.split("\n") if row.strip()]
+  if len(gridRows) != n2 or any(len(row) != (numVer if i&1 else n1) for i, row in enumerate(gridRows)):
+    print("  Error: startingGrid is not the shape of the waffle!")
+    exit()
 
+  horPatterns = [gridRows[2*h] for h in range(numHor)]
+  verPatterns = ["".join(gridRows[k][v] if k&1 else gridRows[k][2*v] for k in range(n2)) for v in range(numVer)]
+  return horPatterns, verPatterns
 
 
-# for massive speedup, precompute some dictionaries
+def fits(word, pattern):
+  return all(p == '.' or p == letter for p, letter in zip(pattern, word))
 
-def make_index(data, max_len):
-  index = {}
 
-  for word in data:
-    for k in range(1, max_len + 1, 2):
-      key = tuple(word[i] for i in range(0, k, 2))
-      index.setdefault(key, []).append(word)
+def make_placements():
 
-  return index
+  horPatterns, verPatterns = parse_grid()
 
-index1 = make_index(data1, n1)
-if n1==n2:
-  index2 = index1
-else:
-  index2 = make_index(data2, n2)
+  # the indexes of places without a required word
+  horShared = [subsetIndex1 if set(pattern) == {'.'} else make_subset_index([i for i, word in enumerate(data1) if fits(word, pattern)]) for pattern in horPatterns]
+  verShared = [subsetIndex2 if set(pattern) == {'.'} else make_subset_index([i for i, word in enumerate(data2) if fits(word, pattern)]) for pattern in verPatterns]
 
-#print(index1)
-#exit()
+  # places are ('h', h) or ('v', v)
+  places = [('h', h) for h in range(numHor)] + [('v', v) for v in range(numVer)]
+  length = {'h': n1, 'v': n2}
+
+  pinned = {}
+  unpinned = []
+  for entry in dict.fromkeys(requiredWords):   # without repeats
+    word, *place = entry.split()
+    if place:
+      place = (place[0][0], int(place[0][1:]))
+      if place not in places or len(word) != length[place[0]]:
+        print("  Error: " + word + " cannot go in " + entry.split()[1] + "!")
+        exit()
+      pinned[place] = word
+    else:
+      if len(word) not in (n1, n2):
+        print("  Error: " + word + " is not " + str(n1) + " or " + str(n2) + " letters!")
+        exit()
+      unpinned.append(word)
+
+  placements = []
+  for unpinnedPlaces in permutations([place for place in places if place not in pinned], len(unpinned)):
+
+    placed = dict(pinned)
+    placed.update(zip(unpinnedPlaces, unpinned))
+
+    # each word must fit its place, startingGrid, and the other required words
+    if any(len(word) != length[kind] for (kind, _), word in placed.items()):
+      continue
+    if any(not fits(word, (horPatterns if kind == 'h' else verPatterns)[i]) for (kind, i), word in placed.items()):
+      continue
+    if any(('v', v) in placed and placed[('v', v)][2*h] != word[2*v] for (kind, h), word in placed.items() if kind == 'h' for v in range(numVer)):
+      continue
+
+    horIndexes = [make_subset_index([required_number(placed[('h', h)])]) if ('h', h) in placed else horShared[h] for h in range(numHor)]
+    verIndexes = [make_subset_index([required_number(placed[('v', v)])]) if ('v', v) in placed else verShared[v] for v in range(numVer)]
+    topLetters = [(2*v, word[0]) for (kind, v), word in placed.items() if kind == 'v' and v > 0]
+    leftLetters = [(2*h, word[0]) for (kind, h), word in placed.items() if kind == 'h' and h > 0]
+    placements.append((horIndexes, verIndexes, topLetters, leftLetters))
+
+  print("  There are", len(placements), "ways to place the required words.")
+  return placements, not pinned and not startingGrid.strip()
+
+
+# The number of a required word, which is added to the end of its word list if it is not in it
+#   (so it is only used where it is required).
+# letters1 and letters2 are made again after all required words have numbers.
+def required_number(word):
+
+  data, wordNumber = (data1, wordNumber1) if len(word) == n1 else (data2, wordNumber2)
+  if word not in wordNumber:
+    wordNumber[word] = len(data)
+    data.append(word)
+  return wordNumber[word]
+
+
+# returns {(w1, w2): [(horIndexes, verIndexes) of each placement that the starting pair fits]}
+def make_pair_placements(placements):
+
+  pairPlacements = {}
+  for horIndexes, verIndexes, topLetters, leftLetters in placements:
+
+    leftWordsByLetter = {}
+    for w2 in [data2[i] for i in verIndexes[0][0]]:
+      if all(w2[k] == letter for k, letter in leftLetters):
+        leftWordsByLetter.setdefault(w2[0], []).append(w2)
+
+    for w1 in [data1[i] for i in horIndexes[0][0]]:
+      if all(w1[k] == letter for k, letter in topLetters):
+        for w2 in leftWordsByLetter.get(w1[0], []):
+          pairPlacements.setdefault((w1, w2), []).append((horIndexes, verIndexes))
+
+  return pairPlacements
+
+
+skipTransposes = True
+
+if seeded:
+  placements, skipTransposes = make_placements()
+  letters1 = "".join(data1).encode("ascii")
+  letters2 = "".join(data2).encode("ascii")
+  pairPlacements = make_pair_placements(placements)
 
 
 
@@ -166,63 +380,497 @@ else:
 #   If there are no vertical words remaining,
 #     the word is still counted but is equal to ''.
 
+# nodeCounts[d] is the number of nodes visited with d words placed
+#   (added up a list of possible words at a time to not slow down the search).
+nodeCounts = [0] * (n2//2 + n1//2 + 3)
+
+
+
+# The word numbers of the waffle so far are in slots[] (which is never copied),
+#   where slots[n] is word n (and is -1 for an empty string).
+slots = [-1] * (n2 + 1)
 
 
 # recursive function to handle the variable number of for loops (number of loops depends on nl)
-def loop_recursive(w, n):
+def loop_recursive(n):
 
   if n < n2:
 
-    if n < n1p:
-      temp1 = tuple(w[i][n] for i in range(1, n, 2))
-    else:
-      temp1 = tuple(w[i][n] for i in range(1, n1p, 2))
+    key = 0
+    for i in range(1, min(n, n1p), 2):
+      key = key*128 + letters2[slots[i]*n2 + n]
+
+    possible_w1 = index1.get_numbers(key)
 
-    possible_w1 = index1.get(temp1, [])
+    depth = n//2 + min(n, n1p)//2 + 1   # the number of words placed after w1
+    nodeCounts[depth] += len(possible_w1)
 
-    for w1 in possible_w1:   # horizontal word
+    if n < n1p:   # if there are still more vertical words to be placed
 
-      if n < n1p:   # if there are still more vertical words to be placed
+      for w1 in possible_w1:   # horizontal word
+        slots[n] = w1
 
-        nn = n + 1
-        ww = w + [w1]
+        key = 0
+        for i in range(0, n + 1, 2):
+          key = key*128 + letters1[slots[i]*n1 + n]
 
-        temp2 = tuple(ww[i][n] for i in range(0, nn, 2))
-        for w2 in index2.get(temp2, []):     # vertical word
-          loop_recursive(ww + [w2], nn + 1)
+        possible_w2 = index2.get_numbers(key)
+        nodeCounts[depth + 1] += len(possible_w2)
+
+        for w2 in possible_w2:     # vertical word
+          slots[n + 1] = w2
+          loop_recursive(n + 2)
+
+    else:
 
-      else:
+      for w1 in possible_w1:   # horizontal word
+        slots[n] = w1
+        loop_recursive(n + 2)
 
-        loop_recursive(w + [w1, ''], n + 2)
 
+  else:     # slots now contains all the words in the waffle
 
-  else:     # w now contains all the words in the waffle
+      w = [data1[slots[i]] if not i&1 else data2[slots[i]] if i < n1p else '' for i in range(n2 + 1)]
 
       # check for repeated words
       realWords = [word for word in w if word]   # removes any placeholder empty strings ''
       if len(realWords) != len(set(realWords)):
         return
 
-      waffle = ''.join(["\n"+" ".join( [w[j][i] for j in range(1,n1p,2)] )+"\n" if i&1 else w[i] for i in range(n2)])  # oof
+      emit(w)
+
+
+
+# For dynamicOrder, the same search but placing the most constrained word next.
+#   hor[h] is the number of horizontal word h (from the top) and ver[v] is the number of
+#   vertical word v (from the left), with -1 for words not yet placed (the lists are never copied).
+#   Horizontal word h and vertical word v share the letter at index 2*v of h and index 2*h of v,
+#   which is digit v of the subset key of h and digit h of the subset key of v.
+# w is made (as strings in the usual alternating order) only when a waffle is found.
+# horIndexes[h] and verIndexes[v] are the subset indexes of the words that can go in each place.
+
+horIndexes = [subsetIndex1] * numHor
+verIndexes = [subsetIndex2] * numVer
+
+hor = [-1] * numHor
+ver = [-1] * numVer
+
+def loop_recursive_dynamic(numPlaced):
+
+  if numPlaced < numHor + numVer:
+
+    # find the remaining word with the fewest possible words
+    best = None
+    for h in range(numHor):
+      if hor[h] < 0:
+        key = 0
+        for v in range(numVer):
+          if ver[v] >= 0:
+            key |= letters2[ver[v]*n2 + 2*h] << 7*v
+        words = subset_lookup(horIndexes[h], key, letters1, n1)
+        if not words:
+          return
+        if best is None or len(words) < len(best):
+          best, places, slot = words, hor, h
+    for v in range(numVer):
+      if ver[v] < 0:
+        key = 0
+        for h in range(numHor):
+          if hor[h] >= 0:
+            key |= letters1[hor[h]*n1 + 2*v] << 7*h
+        words = subset_lookup(verIndexes[v], key, letters2, n2)
+        if not words:
+          return
+        if best is None or len(words) < len(best):
+          best, places, slot = words, ver, v
+
+    nodeCounts[numPlaced + 1] += len(best)
+
+    for word in best:
+      places[slot] = word
+      loop_recursive_dynamic(numPlaced + 1)
+    places[slot] = -1
+
+  else:
+
+    w = [data1[hor[i//2]] if not i&1 else data2[ver[i//2]] if i//2 < numVer else '' for i in range(n2 + 1)]
+
+    # check for repeated words
+    realWords = [word for word in w if word]   # removes any placeholder empty strings ''
+    if len(realWords) != len(set(realWords)):
+      return
+
+    emit(w)
+
+
+
+# searches every waffle starting with the top word w1 and the left word w2
+def search_pair(w1, w2):
+  global horIndexes, verIndexes
+
+  if seeded:
+    hor[0] = wordNumber1[w1]
+    ver[0] = wordNumber2[w2]
+    for horIndexes, verIndexes in pairPlacements[w1, w2]:
+      loop_recursive_dynamic(2)
+  elif dynamicOrder:
+    hor[0] = wordNumber1[w1]
+    ver[0] = wordNumber2[w2]
+    loop_recursive_dynamic(2)
+  else:
+    slots[0] = wordNumber1[w1]
+    slots[1] = wordNumber2[w2]
+    loop_recursive(2)
+
+
+
+# what is done with each waffle that is found (worker processes instead collect them)
+def print_waffle(w):
+
+  waffle = ''.join(["\n"+" ".join( [w[j][i] for j in range(1,n1p,2)] )+"\n" if i&1 else w[i] for i in range(n2)])  # oof
+
+  print()
+  print(waffle)
+  print("      " + " ".join([word for word in w]))
+  print()
+
+emit = print_waffle
+
+
+# what is done with each new waffle (print_waffle() or, if using outputFile, writer.write())
+output = print_waffle
+writer = None
 
-      print()
-      print(waffle)
-      print("      " + " ".join([word for word in w]))
-      print()
 
 
 # prevent identical-under-transpose puzzles by doing the first two words here to enforce w1 < w2,
 #   but only for square waffles
 
-for w1 in data1:
-  #print("  Now starting with " + w1 + " as the first word")
+#   (and only if the required words and letters are the same for the transpose)
 
-  if n1==n2:   # square waffles
-    for w2 in data2:
-      if w2[0]==w1[0] and w1 < w2:
-        loop_recursive([w1,w2], 2)
-  else:
-    for w2 in data2:
-      if w2[0]==w1[0]:
-        loop_recursive([w1,w2], 2)
+def starting_pairs():
+
+  if seeded:
+    for w1, w2 in pairPlacements:
+      if n1!=n2 or not skipTransposes or w1 < w2:
+        yield w1, w2
+    return
+
+  for w1 in data1:
+    #print("  Now starting with " + w1 + " as the first word")
+
+    if n1==n2:   # square waffles
+      for w2 in data2:
+        if w2[0]==w1[0] and w1 < w2:
+          yield w1, w2
+    else:
+      for w2 in data2:
+        if w2[0]==w1[0]:
+          yield w1, w2
+
+
+
+#################################################
+###### optionally use multiple CPU cores
+#################################################
+
+# Each worker process searches a shard (a list of starting pairs) and sends back its waffles.
+# The estimated size of the search after a starting pair (w1, w2) is the number of
+#   horizontal words that could go next (they start with w2[2]) times the number of
+#   vertical words that could go next (they start with w1[2]).
+# Shards are made with roughly equal estimated sizes (a single huge pair is its own shard)
+#   and are handed out largest first, one at a time, to whichever worker is idle,
+#   so a slow shard never leaves the other cores waiting with nothing to do.
+# The main process prints every waffle (each only once; see print_new_waffle()).
+
+
+def pair_weight(pair):
+  w1, w2 = pair
+  return len(index1.get_numbers(ord(w2[2]))) * len(index2.get_numbers(ord(w1[2]))) + 1
+
+
+def make_shards(pairs):
+  pairs = sorted(pairs, key=pair_weight, reverse=True)
+  target = sum(map(pair_weight, pairs)) / (numProcesses * shardsPerProcess)
+
+  shards = []
+  shard = []
+  weight = 0
+  for pair in pairs:
+    shard.append(pair)
+    weight += pair_weight(pair)
+    if weight >= target:
+      shards.append(shard)
+      shard = []
+      weight = 0
+  if shard:
+    shards.append(shard)
+
+  return shards
+
+
+# workers leave stopping to the main process
+def init_worker():
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def search_shard(shard):
+  global emit
+
+  found = []
+  emit = found.append
+  for w1, w2 in shard:
+    search_pair(w1, w2)
+
+  return shard, found
+
+
+
+#################################################
+###### optionally save progress to a checkpoint file
+#################################################
+
+# A starting pair (w1, w2) is done once every waffle starting with it has been printed.
+# The waffles printed for a starting pair that is not done are remembered so that,
+#   after resuming, that pair can be searched again without printing them twice.
+
+donePairs = set()
+printedWaffles = {}   # {(w1, w2): set of printed waffles} for starting pairs that are not done
+
+# a checkpoint only works for the same search of the same word lists
+checkpointSettings = [n1, n2, words_hash(data1), words_hash(data2)]
+if dynamicOrder:
+  checkpointSettings.append("dynamicOrder")
+if countOnly:
+  checkpointSettings.append("countOnly")
+if seeded:
+  checkpointSettings.append([requiredWords, startingGrid])
+
+lastSave = time.time()
+
+
+def save_checkpoint():
+  global lastSave
+
+  # the waffles must be in outputFile before the checkpoint says that they were found
+  if writer:
+    writer.flush()
+
+  checkpoint = {
+    "settings": checkpointSettings,
+    "done": sorted(donePairs),
+    "printed": [[w1, w2, sorted(waffles)] for (w1, w2), waffles in printedWaffles.items()],
+  }
+  if countOnly:
+    checkpoint["wordCounts"] = wordCounts
+    checkpoint["nodeCounts"] = totalNodeCounts
+
+  # write then rename so that an interruption while saving cannot ruin the old checkpoint
+  with open(checkpointFile + ".tmp", "w") as f:
+    json.dump(checkpoint, f)
+  os.replace(checkpointFile + ".tmp", checkpointFile)
+
+  lastSave = time.time()
+
+
+def load_checkpoint():
+
+  with open(checkpointFile) as f:
+    checkpoint = json.load(f)
+
+  if checkpoint["settings"] != checkpointSettings:
+    print("  Error: " + checkpointFile + " is from a search with different settings!")
+    exit()
+
+  donePairs.update(tuple(pair) for pair in checkpoint["done"])
+  for w1, w2, waffles in checkpoint["printed"]:
+    printedWaffles[(w1, w2)] = set(waffles)
+  if countOnly:
+    wordCounts.update(checkpoint["wordCounts"])
+    totalNodeCounts[:] = checkpoint["nodeCounts"]
+
+  print("  Resuming after", len(donePairs), "completed starting pairs.")
+
+
+# print the waffle unless it was already printed before resuming
+def print_new_waffle(w):
+
+  key = " ".join(w)
+  printed = printedWaffles.setdefault((w[0], w[1]), set())
+  if key in printed:
+    return
+  printed.add(key)
+
+  output(w)
+
+
+def pair_done(pair):
+  donePairs.add(pair)
+  printedWaffles.pop(pair, None)
+
+  if checkpointFile and time.time() - lastSave > checkpointSeconds:
+    save_checkpoint()
+
+
+
+#################################################
+###### optionally only count the waffles
+#################################################
+
+# Each starting pair is counted separately, and its counts are only added to the totals
+#   once the pair is done, so a checkpoint never has the counts of a partly searched pair.
+
+wordCounts = {}                        # {w1: number of waffles with w1 as the top word}
+totalNodeCounts = [0] * len(nodeCounts)
+
+waffleCount = 0
+
+
+def count_waffle(w):
+  global waffleCount
+  waffleCount += 1
+
+
+# returns the number of waffles and the nodeCounts for a starting pair
+def count_pair(w1, w2):
+  global waffleCount, emit
+
+  emit = count_waffle
+  waffleCount = 0
+  nodeCounts[:] = [0] * len(nodeCounts)
+  nodeCounts[2] = 1
+
+  search_pair(w1, w2)
+
+  return waffleCount, nodeCounts[:]
+
+
+def count_shard(shard):
+  return shard, [count_pair(w1, w2) for w1, w2 in shard]
+
+
+def add_counts(pair, count, pairNodeCounts):
+  if count:
+    wordCounts[pair[0]] = wordCounts.get(pair[0], 0) + count
+  for d, nodes in enumerate(pairNodeCounts):
+    totalNodeCounts[d] += nodes
+
+
+def print_counts():
+
+  estimate = len(data1)**numHor * len(data2)**numVer / 2.01**((n2 + 1)*(n1 + 1))
+
+  print()
+  for word, count in sorted(wordCounts.items(), key=lambda item: (-item[1], item[0])):
+    print("  " + word, count)
+  print()
+  for d in range(2, len(totalNodeCounts)):
+    print("  Nodes with", d, "words placed:", totalNodeCounts[d])
+  print()
+  print("  Found", sum(wordCounts.values()), "waffles (the estimate is " + format(estimate, ".3g") + ")")
+
+
+
+# Stopping the search with Ctrl+C or with a termination signal (like when a
+#   batch job is preempted) saves a checkpoint before exiting.
+def stop(signalNumber, frame):
+  raise KeyboardInterrupt
+
+
+
+# times a search of every starting pair with each order
+def run_benchmark():
+  global emit, dynamicOrder
+
+  found = []
+  emit = found.append
+
+  results = []
+  for dynamicOrder in (False, True):
+    found.clear()
+    start = time.perf_counter()
+    for w1, w2 in starting_pairs():
+      search_pair(w1, w2)
+    seconds = time.perf_counter() - start
+    results.append(sorted(" ".join(w) for w in found))
+    print("  " + ("Dynamic" if dynamicOrder else "Fixed") + " order found", len(found), "waffles in", round(seconds, 3), "seconds")
+
+  if results[0] != results[1]:
+    print("  Error: the orders found different waffles!")
+
+
+
+if __name__ == "__main__" and benchmark:
+  run_benchmark()
+  exit()
+
+
+if __name__ == "__main__":
+
+  resuming = checkpointFile and resume and os.path.exists(checkpointFile)
+  if resuming:
+    load_checkpoint()
+
+  if outputFile and not countOnly:
+    writer = WaffleWriter(outputFile, n1==n2, append=resuming)
+    output = writer.write
+
+  if checkpointFile:
+    signal.signal(signal.SIGTERM, stop)
+
+  pairs = (pair for pair in starting_pairs() if pair not in donePairs)
+
+  try:
+
+    if numProcesses == 1 and countOnly:
+
+      for w1, w2 in pairs:
+        add_counts((w1, w2), *count_pair(w1, w2))
+        pair_done((w1, w2))
+
+    elif numProcesses == 1:
+
+      emit = print_new_waffle if checkpointFile else output
+      for w1, w2 in pairs:
+        search_pair(w1, w2)
+        pair_done((w1, w2))
+
+    elif countOnly:
+
+      from multiprocessing import Pool
+
+      with Pool(numProcesses, init_worker) as pool:
+        for shard, counts in pool.imap_unordered(count_shard, make_shards(pairs)):
+          for pair, (count, pairNodeCounts) in zip(shard, counts):
+            add_counts(pair, count, pairNodeCounts)
+            pair_done(pair)
+
+    else:
+
+      from multiprocessing import Pool
+
+      with Pool(numProcesses, init_worker) as pool:
+        for shard, found in pool.imap_unordered(search_shard, make_shards(pairs)):
+          for w in found:
+            print_new_waffle(w)
+          for pair in shard:
+            pair_done(pair)
+
+  except KeyboardInterrupt:
+    if checkpointFile:
+      save_checkpoint()
+      print("\n  Stopped. Progress was saved to " + checkpointFile)
+    if writer:
+      writer.close()
+    exit()
+
+  if checkpointFile:
+    save_checkpoint()
+
+  if writer:
+    writer.close()
+    print("  Wrote", writer.count, "waffles to " + outputFile)
 
+  if countOnly:
+    print_counts()
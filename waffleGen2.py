@@ -22,31 +22,24 @@
 # To change the waffle-making strategy, edit the final "main code" section.
 # Keep rerunning the code until you get a puzzle you like!
 #
+# Puzzles are solved and their swaps are counted by waffleSolver.py,
+#   so it must be in the same folder as this file.
+# The word lists are read through the binary cache of wordCache.py,
+#   which is compiled automatically the first time a list is loaded.
+#
 # (c) 2023 Bradley Knockel
 
 
+import json
+import os
+import random
+import signal
+from contextlib import nullcontext
+from math import exp
+from multiprocessing import Pool
 from random import shuffle, sample
 
-
-'''
-# The following import is only needed if using permuteToGetMinSwaps(),
-#   which is not the default.
-# Note that product(*perms) where perms is a list of permutations could use a lot of RAM,
-#   so I don't import product from itertools
-# Instead, I do the product myself using a recursive function that loops over permutations.
-from itertools import permutations
-
-
-# The following import and function are needed only if using permuteToGetMinSwaps()
-#    https://stackoverflow.com/a/5419576
-from collections import defaultdict
-
-def list_duplicates(seq):
-    tally = defaultdict(list)
-    for i,item in enumerate(seq):
-        tally[item].append(i)
-    return (locs for key,locs in tally.items() if len(locs)>1)
-'''
+from waffleSolver import Solver
 
 
 
@@ -115,6 +108,13 @@ talents
 """.strip().lower()
 
 
+# How the fewest swaps are found for the letters left after the easy swaps...
+#   "letters" searches cycles of letters (findLetterCyclesOfGroup), which is much faster
+#   "locations" is the original search of cycles of locations (findCyclesOfGroup)
+# Both find the same number of swaps.
+cycleSearch = "letters"
+
+
 
 
 
@@ -131,6 +131,10 @@ if n1 < 3 or not n1&1 or n2 < 3 or not n2&1:
   print("  Error: only odd sizes greater than 1!")
   exit()
 
+if cycleSearch not in ("letters", "locations"):
+  print("  Error: cycleSearch must be \"letters\" or \"locations\"!")
+  exit()
+
 
 # useful
 half = n2//2 + 1         # the number of horizontal words
@@ -138,11 +142,6 @@ halfVer = n1//2 + 1      # the number of vertical words
 full = (n1 + n2)//2 + 1   # the number of words
 n1p = n1+1
 
-# useful
-fullNew = max(half,halfVer) * 2
-limits = [2*half, 2*halfVer]
-wordListAllNew = [[] for i in range(fullNew)]
-
 # make blank board
 temp = "." * n1 + "\n" + ". " * (n1//2) + ".\n"
 blank = temp * (n2//2) + "." * n1
@@ -162,68 +161,12 @@ for i in range(len(sol)):   # check against structure of blank
 
 
 
-dataLong = False   # do not change
-
-
-
-# load first word list
-isFrequencyMap1 = False
-if n1==5:   # this list is better, but only has 5-letter words
-
-  import json
-  isFrequencyMap1 = True
-  with open('freq_map.json') as f:
-    data1 = json.load(f)
-
-else:
-
-  with open('words_alpha.txt') as f:
-    dataLong = f.read().split()
-
-  data1 = []
-  for word in dataLong:
-    if len(word)==n1:
-      data1.append(word)
-
-
+# the solver of waffleSolver.py, which also finds the fewest swaps
+solver = Solver('words_alpha.txt', 'freq_map.json', cycleSearch)
 
-# load 2nd word list
-
-if n1==n2:
-  data2 = data1
-  isFrequencyMap2 = isFrequencyMap1
-else:
-  isFrequencyMap2 = False
-  if n2==5:   # this list is better, but only has 5-letter words
-
-    import json
-    isFrequencyMap2 = True
-    with open('freq_map.json') as f:
-      data2 = json.load(f)
-
-  else:
-
-    if not dataLong:
-      with open('words_alpha.txt') as f:
-        dataLong = f.read().split()
-
-    data2 = []
-    for word in dataLong:
-      if len(word)==n2:
-        data2.append(word)
-
-
-
-del dataLong   # try to free up RAM
-
-
-
-
-# make countsAll
-countsAll = {}
-goodLetters = sol.replace(' ', '').replace('\n', '').lower()
-for i in 'abcdefghijklmnopqrstuvwxyz':
-  countsAll[i] = goodLetters.count(i)
+# load the word lists now (before any worker processes are started)
+solver.word_list(n1)
+solver.word_list(n2)
 
 
 
@@ -365,725 +308,27 @@ def colorPuzzle(puzzle):
 
 
 #################################################
-###### solver function, which returns number of solutions
+###### solver functions, which use waffleSolver.py
 #################################################
 
 
-def count_solutions(greenMaskAll, lettersAll):
-  global solCount    # needs to be global for loop_recursive()
-
-  wordListAll = []
-
-  for wordNum in range(full):   # find the possibilities for each of the words
-
-
-    # For numbering the words...
-    # Initially, horizontal are first (word on top is 0),
-    #   then vertical (word on right is last).
-    # The numbering system will later be changed.
-
-    # take the correct slice and get correct word list (data), number of letters (nl), and isFrequencyMap
-    if wordNum < half:   # horizontal words
-      start = 2 * wordNum * n1p
-      greenMask = greenMaskAll[ start : start+n1 ]
-      letters = lettersAll[ start : start+n1 ]
-      data = data1
-      nl = n1
-      isFrequencyMap = isFrequencyMap1
-    else:
-      start = 2 * (wordNum - half)
-      greenMask = greenMaskAll[ start :: n1p ]
-      letters = lettersAll[ start :: n1p ]
-      data = data2
-      nl = n2
-      isFrequencyMap = isFrequencyMap2
-
-
-    # make counts
-    # I should probably reduce this further by looking at yellows in other words!?
-    #   Though it doesn't really matter to do it here, because countsAll is checked later.
-    counts = countsAll.copy()
-    for i in 'abcdefghijklmnopqrstuvwxyz':
-      greensInOtherWords = greenMaskAll.count(i) - greenMask.count(i)
-      counts[i] = counts[i] - greensInOtherWords
-    for i in letters:
-      if i.islower() and i not in greenMask and i.upper() not in letters:
-        counts[i] = 0
-
-
-
-    # make wordNoGreen
-    wordNoGreen = list(letters)
-    for k in range(nl):
-      if letters[k]==greenMask[k]:
-        wordNoGreen[k] = '.'
-    wordNoGreen = "".join(wordNoGreen)
-
-
-
-    #######################
-    ###### make letterList[]
-    #######################
-
-    # letterList[] = [ [letter, badLocations, countMin, countMax] , ...]
-    letterList = []
-
-    for i,j in enumerate(letters):   # j is a letter
-
-        # is j the first yellow of that letter in the word?
-        if j.isupper() and j not in letters[:i]:
-
-          count = letters.count(j)  # yellows for now; greens added next
-          for k in range(nl):
-            if letters[k]==j.lower() and letters[k]==greenMask[k]:
-              count += 1
-
-          # assume that the other word has not had all of its other letters solved
-          countEven = letters[0::2].count(j)   # yellows that could be part of another word instead
-
-          badLocations = [k for k in range(nl) if wordNoGreen.upper()[k] == j]
-
-          if j.lower() in wordNoGreen:   # if there is a grey of the letter
-            letterList.append([ j.lower(), badLocations, count - countEven, count ])
-          else:
-            letterList.append([ j.lower(), badLocations, count - countEven, counts[j.lower()] ])
-
-        # is j is a green with no yellows of the same letter
-        elif j==greenMask[i] and j.upper() not in letters:
-
-          # we only need the first green in word
-          if j in greenMask[:i]:
-            continue
-
-          # we only care if we learn that there aren't any more of the letter in the word
-          if j in wordNoGreen:
-
-            count = 0
-            for k in range(nl):
-              if letters[k]==j and letters[k]==greenMask[k]:
-                count += 1
-
-            letterList.append([ j, [], count, count ])
-
-
-
-
-    #######################
-    ###### search through all words in word list
-    #######################
-
-    wordList = []
-
-    for word in data:
-
-      # greenMask[]
-      if any( g.isalpha() and g!=w for (g, w) in zip(greenMask, word)):
-        continue
-
-      # counts[]
-      if any(word.count(i)>counts[i] for i in word):
-        continue
-
-      # letterList[]
-      go = True
-      for entry in letterList:
-        if word.count(entry[0]) < entry[2] or word.count(entry[0]) > entry[3] or entry[0] in [word[i] for i in entry[1]]:
-          go = False
-          break
-
-      if go:
-        if isFrequencyMap:
-
-          # do not print words with low frequency (optional)
-          #if data[word] <= 1e-7:
-          #  continue
-
-          wordList.append((data[word], word))
-
-        else:
-          # frequency is unknown, so I put 1
-          wordList.append((1, word))
-
-    wordListAll.append(wordList)
-
-
+# If limit is not 0, the search stops as soon as limit solutions are found,
+#   so the returned count is at most limit.
+def count_solutions(greenMaskAll, lettersAll, limit=0):
+  return solver.count_solutions(greenMaskAll, lettersAll, limit)
 
-  #######################
-  ###### see which combinations work
-  #######################
 
-  # New numbering system...
-  #   Word on top is 0,
-  #   and the vertical word on the left is 1.
-  #   It keeps alternating between horizontal and vertical.
-  #   If there are no vertical or horizontal words remaining,
-  #   the word is still counted but is equal to ''.
 
-  for i in range(half):
-    wordListAllNew[i*2] = wordListAll[i]
-  for i in range(halfVer):
-    wordListAllNew[i*2 + 1] = wordListAll[half + i]
+# Only says whether a puzzle has 0 solutions, 1 solution, or many solutions (returns 2),
+#   which is all that making a puzzle needs to know and is much faster than counting them all.
+def solution_status(greenMaskAll, lettersAll):
+  return count_solutions(greenMaskAll, lettersAll, 2)
 
 
 
-  # recursive function to handle the variable number of for loops (number of loops depends on n1 and n2)
-  def loop_recursive(w, n):
-    global solCount     # this is the "returned" output of the function
-
-    if n < fullNew:
-
-      if wordListAllNew[n]:
-
-        temp = (n//2)*2   # 0, 0, 2, 2, 4, 4, ...
-        temp2 = (n+1)&1   # 1, 0, 1, 0, 1, 0, ...
-        temp3 = "".join( [w[j][temp] for j in range(temp2, min(n, limits[temp2]), 2)] )
-
-        for _,word in wordListAllNew[n]:
-          if word[0:n:2] == temp3 :
-            loop_recursive(w + [word], n + 1)
-
-      else:
-        loop_recursive(w + [''], n + 1)
-
-    else:    # w is now a permutation that contains all (n1 + n2)/2 + 1 words and some ''
-
-      # check counts
-      letters = ''.join( [w[i][1::2] if i&1 else w[i] for i in range(fullNew)] )
-      for i in set(letters):    # is this faster than:  i in letters
-        if letters.count(i) != countsAll[i]:
-          return
-
-      solCount += 1
-
-
-
-
-  solCount = 0
-
-  loop_recursive([], 0)
-
-  return solCount
-
-
-
-
-#################################################
-###### define function get_optimal_swaps(), which counts optimal swaps
-#################################################
-
-
+# the fewest swaps that turn lettersAll into sol
 def get_optimal_swaps(greenMaskAll, lettersAll):
-
-  # remove greens and other garbage from sol and lettersAll
-  solution = list(sol)
-  lettersTemp = list(lettersAll.lower())
-  for i in range(len(greenMaskAll)):
-    if greenMaskAll[i].isalpha():
-      solution[i] = " "
-      lettersTemp[i] = " "
-  solution_string = "".join(solution).replace(' ', '').replace('\n', '')
-  lettersAll_string = "".join(lettersTemp).replace(' ', '').replace('\n', '')
-
-  counts = {}
-  for i in solution_string:
-    counts[i] = solution_string.count(i)
-
-  solution_list = list(solution_string)
-  letters_list = list(lettersAll_string)
-
-
-
-
-  # Does swaps that make 2 new greens. This is optional but can GREATLY speed up the permutation part of the code.
-  # Modifies: solution_list, letters_list, and counts
-  def swapToTwoGreens():
-
-    swaps = 0
-
-    indices = []   # for marking indices that are already solved
-    for i in range(len(solution_list)):
-      for j in range(i+1, len(solution_list)):
-        if i in indices or j in indices:
-          continue
-        if solution_list[j] == letters_list[i] and solution_list[i] == letters_list[j]:
-          indices.append(i)
-          indices.append(j)
-          swaps += 1
-
-    indices.sort(reverse=True)
-    for ind in indices:
-
-      # update counts
-      letter = solution_list[ind]
-      if counts[letter] == 1:
-        counts.pop(letter)
-      else:
-        counts[letter] -= 1
-
-      # remove from lists
-      solution_list.pop(ind)
-      letters_list.pop(ind)
-
-    return swaps
-
-
-
-  # The following is optional but safe. It will speed up the permutation part of the code.
-  # Does all swaps that swap a letter to its correct position if there is only one swappable instance of that letter
-  # Modifies: solution_list, letters_list, and counts
-  def swapSafe():
-
-    swaps = 0
-
-    toDelete = []   # for marking letters that are already solved
-    for letter in counts:
-      if counts[letter] == 1:
-
-        i = solution_list.index(letter)
-        j = letters_list.index(letter)
-
-        if i!=j:
-          swaps += 1
-          letters_list[j] = letters_list[i]   # swap; no need to update letters_list[i] because it will be deleted
-
-        # remove the now green letter
-        toDelete.append(letter)
-        solution_list.pop(i)
-        letters_list.pop(i)
-
-    for letter in toDelete:
-      counts.pop(letter)
-
-    # cleanup a bit
-    for i in range(len(letters_list)-1, -1, -1):
-      if letters_list[i] == solution_list[i]:  # if puzzle equals solution
-        if counts[letters_list[i]] == 1:
-          counts.pop(letters_list[i])
-        else:
-          counts[letters_list[i]] -= 1
-        letters_list.pop(i)
-        solution_list.pop(i)
-
-    return swaps
-
-
-
-
-  # The following is optional but safe.
-  # If every remaining target spot for a letter contains the same wrong letter,
-  # then all instances of that letter can be swapped into their correct positions.
-  #
-  # Example:
-  #   solution_list has A A in two spots
-  #   letters_list  has B B in those same spots
-  # Then every A can safely be swapped into one of those A-spots.
-  #
-  # This function technically could also be coded to do what swapSafe() does,
-  #   but swapSafe is faster and cleaner. Though, comment the 2 labeled lines
-  #   if you want to not need swapSafe.
-  #   swapSafe does NOT need to be called before this.
-  #
-  # Modifies: solution_list, letters_list, counts
-  def swapForcedSameSource():
-
-    swaps = 0
-
-    def rebuildCounts():
-      counts.clear()
-      for letter in solution_list:
-        if letter in counts:
-          counts[letter] += 1
-        else:
-          counts[letter] = 1
-
-    def cleanupGreens():
-      # remove any letters that are already solved
-      for i in range(len(letters_list)-1, -1, -1):
-        if letters_list[i] == solution_list[i]:
-          letters_list.pop(i)
-          solution_list.pop(i)
-
-      rebuildCounts()
-
-    # make sure counts is accurate
-    rebuildCounts()
-
-    while True:
-
-      didSomething = False
-
-      for letter in list(counts):
-
-        # swapSafe() already handles letters with only one remaining instance
-        if counts[letter] <= 1:
-          continue
-
-        # Find every location where this letter belongs.
-        targetIndices = []
-        for i in range(len(solution_list)):
-          if solution_list[i] == letter:
-            targetIndices.append(i)
-
-        # What letters are currently sitting in those target locations?
-        targetLetters = set()
-        for i in targetIndices:
-          targetLetters.add(letters_list[i])
-
-        # This trick only works if all target locations contain the same wrong letter.
-        if len(targetLetters) != 1:
-          continue
-
-        sourceLetter = next(iter(targetLetters))
-
-        # This should already be impossible if greens were cleaned up,
-        # but leave it here for safety.
-        if sourceLetter == letter:
-          continue
-
-        # Find every current instance of the letter.
-        sourceIndices = []
-        for i in range(len(letters_list)):
-          if letters_list[i] == letter:
-            sourceIndices.append(i)
-
-        # This should always be true if letters_list and solution_list have
-        # the same multiset of letters.
-        if len(sourceIndices) != len(targetIndices):
-          continue
-
-        # Swap each current instance of letter into one of its target locations.
-        # The pairing does not matter because all target locations contain sourceLetter.
-        for i, j in zip(targetIndices, sourceIndices):
-          swaps += 1
-
-          # We do not really need to put letter at index i because index i
-          # will become green and be removed. But doing the full-looking swap
-          # makes the logic easier to read.
-          letters_list[j] = letters_list[i]
-          letters_list[i] = letter
-
-        cleanupGreens()
-        didSomething = True
-        break   # restart because the lists and counts have changed
-
-      if not didSomething:
-        break
-
-    return swaps
-
-
-
-
-  '''
-  # If no duplicates, you just mindlessly move things to where they belong and you'll get the optimal number of swaps.
-  # Functions for this, minSwapsToSort() and minSwapToMakeArraySame(), are below.
-  # The above swapSafe() would also do it.
-  #
-  # With duplicates, the problem is harder...
-  #   https://stackoverflow.com/questions/18292202/finding-the-minimum-number-of-swaps-to-convert-one-string-to-another-where-the
-  #
-  # Let's say there are 3 r's in solution_list. I will instead call them r0, r1, and r2 in solution_list.
-  # Then I will make many versions of letters_list (called letters) that have permutations of r0, r1, and r2.
-  # Then, I use the above no-duplicate code for each version of letters_list until I find an optimal one!
-  # The coding of this is lengthy because there could be many different letters that are repeated.
-  #
-  # Modifies solution_list a bit by adding numbers after the letters then clobbering it.
-  # Requires letters_list and counts.
-
-  def permuteToGetMinSwaps():
-    global bestSwaps    # what this function "returns"
-
-
-    #   https://www.geeksforgeeks.org/minimum-number-swaps-required-sort-array/
-    #  Duplicates are not allowed
-
-    def minSwapsToSort(arr, n):
-      ans = 0
-      temp = arr.copy()
-      h = {}
-      temp.sort()
-      for i in range(n):
-          h[arr[i]] = i
-      init = 0
-      for i in range(n):
-          if (arr[i] != temp[i]):
-              ans += 1
-              init = arr[i]
-              new = h[temp[i]]
-              arr[i], arr[new] = arr[new], arr[i]
-              h[init] = new
-              h[temp[i]] = i
-      return ans
-
-
-
-    #   https://www.geeksforgeeks.org/minimum-swaps-to-make-two-array-identical/
-
-    def minSwapToMakeArraySame(a, b, n):
-      mp = {}
-      for i in range(n):
-          mp[b[i]] = i
-      for i in range(n):
-          b[i] = mp[a[i]]
-      return minSwapsToSort(b, n)
-
-
-    # To speed up the code for many hard puzzles, create get_puz_from_sol[] and ind_of_puz[].
-    # These let you remove duplicate permutations.
-    # If AABBCC is the puzzle with solution BBCCAA, the code would otherwise check 8 permutations,
-    #   but there really is only 1 that is needed, hence the need for ways to check for repeats.
-    #   Note that, since permutations grow factorially, this can really help!
-    # The following will have the same sizes as permStarts[] and p[]...
-    get_puz_from_sol = []
-    ind_of_puz = []   # also, just generally useful for speeding up the code
-
-
-    permStarts = []
-    solution_list_old = solution_list[:]
-    for letter,count in counts.items():
-
-      # I can't make a list of permutations themselves because they are generators
-      #   that can only be used once.
-      #   I wonder if itertools' cycle(permutations()) would be faster??
-      permStarts.append( tuple([ letter+str(i) for i in range(count) ]) )
-
-      # Modify solution_list and append to get_puz_from_sol
-      ind = 0
-      temp = ''  # to be appended to get_puz_from_sol
-      for i in range(count):
-        for j in range(ind, len(solution_list)):
-          if solution_list[j]==letter:
-            ind = j
-            break
-        temp += letters_list[ind]
-        solution_list[ind] = letter + str(i)   # now duplicate letters are numbered
-      get_puz_from_sol.append(temp)
-
-
-      # append to ind_of_puz[]
-      temp = []
-      ind = -1
-      for i in range(count):
-
-        # find the index, ind
-        for j in range(ind+1, len(letters_list)):
-          if letters_list[j]==letter:
-            ind = j
-            break
-
-        temp.append(ind)
-
-      ind_of_puz.append(tuple(temp))
-
-
-
-    # Recursive function to handle the variable length of perms to loop through
-    def loop_recursive_perms(p, n):
-      global bestSwaps    # what this function "returns"
-
-      if n < len(permStarts):
-        for perm in permutations(permStarts[n]):
-
-          # to speed things up, prune this branch if there are duplicate permutations
-          pairs = []
-          for i,l in enumerate(perm):   # create pairs[]
-            ind = int(l[1])
-            pairs.append(get_puz_from_sol[n][ind] + solution_list_old[ind_of_puz[n][i]])
-          stop = False
-          for dup in list_duplicates(pairs):
-            # insist that duplicate permutations be in increasing order; else stop
-            v = int(perm[dup[0]][1])
-            for k in dup[1:]:
-              vNew = int(perm[k][1])
-              if v > vNew:
-                stop = True
-                break
-              v = vNew
-            if stop:   # does this speed things up?
-              break
-          if stop:
-            continue
-
-          loop_recursive_perms(p + [perm], n + 1)
-  
-      else:    # p is now a list of specific permutations
-
-        # create letters from letters_list, but now with specific permutations
-        letters = letters_list[:]
-        for perm in p:
-          ind = 0
-          for i in range(len(perm)):
-
-            # find the index, ind
-            for j in range(ind, len(letters)):
-              if letters[j]==perm[0][0]:
-                ind = j
-                break
-
-            letters[ind] = perm[i]
-
-        temp = letters[:]   # minSwapToMakeArraySame() clobbers letters[]
-        swapsTemp = minSwapToMakeArraySame( solution_list, letters, len(solution_list) )
-
-        if swapsTemp < bestSwaps:
-          bestSwaps = swapsTemp
-
-
-    bestSwaps = 1000000    # any large enough number
-    loop_recursive_perms([], 0)
-  '''
-
-
-
-
-  # Requires letters_list and solution_list, which are the remaining letters to be solved
-  # and the proper placement of those remaining letters, respectively
-  #
-  # Assumes swapToTwoGreens() was called immediately before this function,
-  # so no 2-cycles remain.
-
-  def findCyclesToGetMinSwaps():
-
-    leng = len(letters_list)
-
-    # the following is explicitly needed because Python's max() doesn't like empty lists
-    if leng == 0:
-      return 0
-
-
-    ### find and print all the cycles
-
-    def canonicalCycle(cyc):
-      # A cycle can be written starting from any point.
-      # This gives one standard version so repeats can be checked with a set.
-      cycTuple = tuple(cyc)
-      return min(cycTuple[i:] + cycTuple[:i] for i in range(len(cycTuple)))
-
-
-    def loop_recursive_cycles(cyc, depth, history):
-      # "globals": n, leng, cycles_seen, and cyclesGood
-
-      # did you find a cycle that has not yet been found?
-      if cyc[-1][0] == cyc[0][1]:
-        key = canonicalCycle(cyc)
-        if key not in cycles_seen:
-          cycles_seen.add(key)
-          cyclesGood.append(cyc[:])
-        return
-
-      if depth < leng - n:
-
-        for j in zip(letters_list[n+1:], solution_list[n+1:]):
-
-          if j[1] != cyc[-1][0] or j[0] in history:
-            continue
-
-          loop_recursive_cycles(cyc + [j], depth+1, history | {j[0]})
-
-
-    cycles_seen = set()  # to not collect repeats
-    cyclesGood = []      # will list all the cycles
-
-    for n, i in enumerate(zip(letters_list[:-1], solution_list[:-1])):
-      loop_recursive_cycles([i], 1, {i[0]})
-
-    # sort by length to speed up later code a bit
-    cyclesGood = sorted(cyclesGood, key=len)
-
-    # optionally print cycles
-    #for cyc in cyclesGood:
-    #  print()
-    #  print("".join([i[0] for i in cyc]))
-    #  print("".join([i[1] for i in cyc]))
-
-
-
-    ### go through cycles and fit them together in every possible way
-
-    best = []   # best list of cycle indices found so far
-
-    # If swapToTwoGreens() has already removed all 2-cycles, then every remaining cycle
-    # has length at least 3. If you are not 100% sure of that, change this to 2.
-    minCycleLengthLeft = 3
-
-    def loop_recursive_combine_cycles(cycList, currentSituation):
-      # "globals": best
-
-      nonlocal best
-
-      # did you complete the puzzle?
-      if len(currentSituation) == 0:
-        if len(cycList) > len(best):
-          best = cycList[:]
-        return
-
-      # Branch-and-bound:
-      # even in the best case, the remaining letters can create at most this many cycles.
-      if len(cycList) + len(currentSituation) // minCycleLengthLeft <= len(best):
-        return
-
-      index = cycList[-1] - 1
-      for cyc in cyclesGood[cycList[-1]:]:   # allows repeats of the same cycle
-        index += 1
-
-        # trying to speed things up (only works if cyclesGood is sorted by length)
-        if len(cyc) > len(currentSituation):
-          break
-
-        currentSituationNew = currentSituation[:]
-        try:
-          for j in cyc:
-            currentSituationNew.remove(j)
-        except ValueError:
-          continue   # cyc could not be removed
-
-        loop_recursive_combine_cycles(cycList + [index], currentSituationNew)
-
-
-    for i, cyc in enumerate(cyclesGood):
-
-      # convert to a different data structure
-      currentSituation = list(zip(letters_list, solution_list))
-
-      # remove cyc
-      try:
-        for j in cyc:
-          currentSituation.remove(j)
-      except ValueError:
-        continue
-
-      loop_recursive_combine_cycles([i], currentSituation)
-
-    # optionally print
-    #print()
-    #print(best)
-    #print("swaps =", leng - len(best))
-
-
-    return leng - len(best)      # each cycle takes its length minus 1 swaps
-
-
-
-
-  ######## do everything!
-
-  swaps = 0
-
-  # Perhaps instead put the first 3 in a loop until no new changes are made, though that seems extreme!
-  # I am not sure if doing all of the following actually speeds things up since most puzzles will probably be easy.
-  swaps += swapToTwoGreens()
-  swaps += swapSafe()
-  swaps += swapForcedSameSource()
-  swaps += swapToTwoGreens()   # swapToTwoGreens must be called immediately before findCyclesToGetMinSwaps
-
-  #print("".join(letters_list))
-  #print("".join(solution_list))
-
-  #permuteToGetMinSwaps()
-  #swaps += bestSwaps
-  swaps += findCyclesToGetMinSwaps()
-
-  return swaps
+  return solver.optimal_swaps(greenMaskAll, lettersAll, sol)[0]
 
 
 
@@ -1179,44 +424,253 @@ def strategy3():
         j += 1
 
     greenMaskAll, lettersAll, trivial = colorPuzzle(puzzle)
-    solCount = count_solutions(greenMaskAll, lettersAll)
-    swaps = get_optimal_swaps(greenMaskAll, lettersAll)
+    solCount = solution_status(greenMaskAll, lettersAll)
+    if solCount == 1:   # else the loop ends anyway
+      swaps = get_optimal_swaps(greenMaskAll, lettersAll)
 
-    print(".")
+    if not numPuzzles:
+      print(".")
 
   return puzzle
 
 
 
 
+### Strategy 4: search for a puzzle with exactly swapGoal optimal swaps
+#  Like strategy3(), this does one swap at a time, but a swap that makes the puzzle worse
+#    (further from swapGoal, or having a trivial move) is sometimes undone,
+#    and a swap that loses the one solution is always undone.
+#  How likely a worse swap is to be kept depends on a "temperature" that slowly cools (simulated annealing).
+#  To need few evaluations, most tried swaps are ones that should move the optimal swaps in the right direction:
+#    a swap that makes no new greens usually adds a swap, and a swap that makes a new green usually removes one.
+#  If swapGoal is not reached after maxSteps evaluations, the best puzzle found is returned,
+#    or None if no swap was ever kept (the solved puzzle is never kept or returned).
+
+maxSteps = 300
+startTemperature = 2.0
+coolingRate = 0.98   # temperature is multiplied by this after every step
+
+def strategy4():
+
+  puzzle = list(sol)
+  solLetters = list(sol.replace(' ', '').replace('\n', ''))
+  temp = solLetters[:]
+
+  swaps = 0
+  cost = swapGoal   # the distance from swapGoal, plus 1 if there is a trivial move
+  best = None       # (cost, puzzle) of the best puzzle that was kept
+  temperature = startTemperature
+
+  for step in range(maxSteps):
+
+    # choose a swap of 2 different letters that makes new greens only if there are too many swaps
+    #   (or else the last swap of 2 different letters that was tried)
+    tooMany = swaps > swapGoal
+    swap = None
+    for tries in range(20):
+      i1, i2 = sample(range(len(temp)), 2)
+      if temp[i1] == temp[i2]:
+        continue
+      swap = (i1, i2)
+      makesGreen = temp[i1] == solLetters[i2] or temp[i2] == solLetters[i1]
+      if makesGreen == tooMany:
+        break
+
+    if swap is None:   # swapping 2 of the same letter would change nothing
+      continue
+    i1, i2 = swap
+
+    tempNew = temp[:]
+    tempNew[i1], tempNew[i2] = tempNew[i2], tempNew[i1]
+
+    # put tempNew back into puzzle
+    puzzleNew = puzzle[:]
+    j=0
+    for i,l in enumerate(puzzleNew):
+      if l.isalpha():
+        puzzleNew[i] = tempNew[j]
+        j += 1
+
+    greenMaskAll, lettersAll, trivial = colorPuzzle(puzzleNew)
+
+    if not numPuzzles:
+      print(".")
+
+    temperature *= coolingRate
+
+    if solution_status(greenMaskAll, lettersAll) != 1:
+      continue
+
+    swapsNew = get_optimal_swaps(greenMaskAll, lettersAll)
+    if not swapsNew:   # swapped back to the solved puzzle
+      continue
+    costNew = abs(swapsNew - swapGoal) + trivial
+
+    if costNew <= cost or random.random() < exp((cost - costNew) / temperature):
+      temp, puzzle, cost, swaps = tempNew, puzzleNew, costNew, swapsNew
+      if best is None or cost < best[0]:
+        best = (cost, puzzle[:])
+      if not cost:
+        break
+
+  return best[1] if best else None
+
+
+
+
+### choose strategy here
+
+strategy = strategy3
+
+
+
+
+### make many puzzles
+#  Instead of making one puzzle, set numPuzzles to make that many different puzzles that pass
+#    every check (one solution and no trivial moves) and append them to packFile,
+#    which has one JSON object per line (in the format that waffleBatch.py reads).
+#  Puzzles already in packFile are not added again.
+#  Each attempt seeds its random numbers from seed and its attempt number, so runs can be repeated,
+#    and attempts can run in parallel by setting numProcesses.
+#  If sol cannot make enough different puzzles (or packFile already has them all), the pack is
+#    stopped early: an attempt gives up after maxTries puzzles that are not accepted, and the pack
+#    stops after maxStaleRounds rounds of attempts in a row that add no new puzzles.
+
+numPuzzles = 0
+numProcesses = 1
+packFile = "puzzlePack.jsonl"
+seed = None    # None for a random seed
+maxTries = 1000
+maxStaleRounds = 3
+
+
+
+
 ### make and analyze puzzle
 
-trivial = True
+if __name__ == "__main__" and not numPuzzles:
 
-while trivial or solCount!=1:
+  trivial = True
 
-  puzzle = strategy3()    # choose strategy here
+  while trivial or solCount!=1:
 
-  greenMaskAll, lettersAll, trivial = colorPuzzle(puzzle)
+    puzzle = strategy()
 
-  print()
-  print(sol)
-  print()
-  print(greenMaskAll)   # print greens
-  print("  There are", greenMaskAll.count('.'), "unsolved locations.")
-  print()
-  print(lettersAll)     # yellows are capitalized
-  print()
-  print("  Puzzle has a trivial move?", trivial)
-  print()
+    if puzzle is None:   # strategy4() found nothing, so try again
+      print("  No puzzle was found. Trying again...")
+      continue
 
-  solCount = count_solutions(greenMaskAll, lettersAll)
+    greenMaskAll, lettersAll, trivial = colorPuzzle(puzzle)
 
-  print("  solution count =", solCount)
-  print()
+    print()
+    print(sol)
+    print()
+    print(greenMaskAll)   # print greens
+    print("  There are", greenMaskAll.count('.'), "unsolved locations.")
+    print()
+    print(lettersAll)     # yellows are capitalized
+    print()
+    print("  Puzzle has a trivial move?", trivial)
+    print()
+
+    solCount = solution_status(greenMaskAll, lettersAll)
+
+    print("  solution count =", solCount if solCount < 2 else "2 or more")
+    print()
+
+    swaps = get_optimal_swaps(greenMaskAll, lettersAll)
+
+    print("  optimal swaps =", swaps)
+    print()
+
+
+
+
+# puzzle-pack functions (see the settings above)
+
+# keeps making puzzles until one is accepted (returns None after maxTries puzzles are not accepted)
+def make_puzzle(attemptSeed):
+
+  random.seed(attemptSeed)
+
+  for tries in range(maxTries):
+
+    puzzle = strategy()
+    if puzzle is None:
+      continue
+    greenMaskAll, lettersAll, trivial = colorPuzzle(puzzle)
+    if trivial or solution_status(greenMaskAll, lettersAll) != 1:
+      continue
+
+    swaps = get_optimal_swaps(greenMaskAll, lettersAll)
+    return {"solution": sol, "greenMaskAll": greenMaskAll, "lettersAll": lettersAll, "swaps": swaps}
+
+  return None
+
+
+# workers leave stopping to the main process
+def init_worker():
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
 
-  swaps = get_optimal_swaps(greenMaskAll, lettersAll)
 
-  print("  optimal swaps =", swaps)
+def make_puzzle_pack():
+  global seed
+
+  if seed is None:
+    seed = random.SystemRandom().getrandbits(64)
+
+  seen = set()
+  if os.path.exists(packFile):
+    with open(packFile) as f:
+      for line in f:
+        if line.strip():
+          entry = json.loads(line)
+          seen.add((entry["greenMaskAll"], entry["lettersAll"]))
+
+  # Most attempts make an accepted puzzle, but some might be repeats,
+  #   so keep doing rounds of attempts until there are enough new puzzles.
+  accepted = 0
+  attempt = 0
+  staleRounds = 0   # rounds in a row without a new puzzle
+  with open(packFile, "a") as f, (Pool(numProcesses, init_worker) if numProcesses > 1 else nullcontext()) as pool:
+    while accepted < numPuzzles:
+
+      if staleRounds == maxStaleRounds:
+        print()
+        print("  Stopping because", maxStaleRounds, "rounds of attempts in a row made no new puzzles")
+        break
+      staleRounds += 1
+
+      attempts = [str(seed) + ":" + str(k) for k in range(attempt, attempt + numPuzzles - accepted)]
+      attempt += len(attempts)
+
+      results = pool.imap_unordered(make_puzzle, attempts) if pool else map(make_puzzle, attempts)
+      for entry in results:
+
+        if entry is None:   # the attempt gave up
+          continue
+        key = (entry["greenMaskAll"], entry["lettersAll"])
+        if key in seen:
+          continue
+        seen.add(key)
+
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+        accepted += 1
+        staleRounds = 0
+
+        print()
+        print(entry["greenMaskAll"])
+        print()
+        print(entry["lettersAll"])
+        print()
+        print("  optimal swaps =", entry["swaps"])
+        print("  accepted", accepted, "of", numPuzzles)
+
   print()
+  print("  accepted", accepted, "of", numPuzzles, "puzzles")
+  print("  seed =", seed, "and", attempt, "attempts")
+
 
+if __name__ == "__main__" and numPuzzles:
+  make_puzzle_pack()
@@ -0,0 +1,1115 @@
+#!/usr/bin/env python3.11
+#
+# The optimal solver of waffle.py as something that can be imported.
+#
+# waffle.py is a script that solves the one puzzle typed into its top section (using a Solver),
+#   so solving many puzzles with it means starting Python and loading word lists for every puzzle.
+# Instead, a Solver loads each word list once (the first time a puzzle needs it),
+#   then solves as many puzzles as you want, returning the results instead of printing them...
+#
+#   from waffleSolver import Solver
+#   solver = Solver()
+#   result = solver.solve(greenMaskAll, lettersAll)
+#   print(result["solution"], result["swaps"])
+#
+# greenMaskAll and lettersAll are in the same format as in waffle.py.
+# solve() returns a dictionary...
+#   "wordLists"   the possible words for each word (horizontal words first, then vertical)
+#   "solutions"   every solution found (each in the format of greenMaskAll)
+#   "solution"    the solution that swaps are found for (the last one found), or None
+#   "swaps"       the optimal number of swaps, or None if there is no solution
+#   "swapList"    [(i, j), ...] where i and j are the indices of greenMaskAll that are swapped
+# Invalid input raises a ValueError with the message that waffle.py prints.
+#
+# Solver(cycleSearch="locations") uses findCyclesOfGroup() instead of findLetterCyclesOfGroup()
+#   for the cycle search (both find the same number of swaps).
+#
+# (c) 2023 Bradley Knockel
+
+
+from wordCache import load_words, load_frequencies
+from wordFilter import make_word_arrays, filter_words, prune_crossings
+
+
+
+class Solver:
+
+  # frequencyFile is used for 5-letter words and wordFile for all other lengths
+  # The possible words of a word of a puzzle are remembered (up to candidateCacheSize of them),
+  #   because puzzles that are solved one after another often share many words
+  #   (such as the puzzles made by waffleGen2.py, which change only a few words at a time).
+  def __init__(self, wordFile='words_alpha.txt', frequencyFile='freq_map.json', cycleSearch="letters", candidateCacheSize=10000):
+    if cycleSearch not in ("letters", "locations"):
+      raise ValueError('cycleSearch must be "letters" or "locations"!')
+    self.wordFile = wordFile
+    self.frequencyFile = frequencyFile
+    self.cycleSearch = cycleSearch
+    self.candidateCacheSize = candidateCacheSize
+    self.wordLists = {}        # {length: (data, wordArrays, isFrequencyMap)}
+    self.shapes = {}           # {(n1, n2): crossings(n1, n2)}
+    self.candidateCache = {}   # {(greenMask, letters, counts): wordList}
+
+
+  # For a waffle with n1-letter horizontal words and n2-letter vertical words (only made the first time), returns...
+  #   crossOf[wordNum] = [ (index, crossing word, index in the crossing word, bit of the crossing), ... ]
+  #   newIndicesOf[wordNum][crossed] = the indices of the letters of the word that are not shared with
+  #     the crossing words that are already chosen, where crossed has the bits of those crossings
+  def crossings(self, n1, n2):
+
+    if (n1, n2) not in self.shapes:
+
+      half = n2//2 + 1
+      halfVer = n1//2 + 1
+
+      crossOf = [[(2*v, half + v, 2*h, 1 << v) for v in range(halfVer)] for h in range(half)]
+      crossOf += [[(2*h, h, 2*v, 1 << h) for h in range(half)] for v in range(halfVer)]
+
+      newIndicesOf = []
+      for length, numCrossings in [(n1, halfVer)] * half + [(n2, half)] * halfVer:
+        newIndicesOf.append([tuple([k for k in range(length) if k&1 or not crossed >> (k//2) & 1])
+                             for crossed in range(1 << numCrossings)])
+
+      self.shapes[(n1, n2)] = (crossOf, newIndicesOf)
+
+    return self.shapes[(n1, n2)]
+
+
+  # load the word list for a length (only the first time)
+  def word_list(self, length):
+
+    if length not in self.wordLists:
+
+      if length==5 and self.frequencyFile:   # this list is better, but only has 5-letter words
+        isFrequencyMap = True
+        data = load_frequencies(self.frequencyFile, length)
+      else:
+        isFrequencyMap = False
+        data = load_words(self.wordFile, length)
+
+      self.wordLists[length] = (data, make_word_arrays(data), isFrequencyMap)
+
+    return self.wordLists[length]
+
+
+
+  def solve(self, greenMaskAll, lettersAll):
+
+    wordListAll, solutions = self.find_solutions(greenMaskAll, lettersAll)
+
+    result = {
+      "wordLists": [[word for _,word in wordList] for wordList in wordListAll],
+      "solutions": solutions,
+      "solution": None,
+      "swaps": None,
+      "swapList": [],
+    }
+    if solutions:
+      result["solution"] = solutions[-1]
+      result["swaps"], result["swapList"] = self.optimal_swaps(greenMaskAll, lettersAll, solutions[-1])
+    return result
+
+
+
+  # Returns the number of solutions. If limit is not 0, the search stops as soon as
+  #   limit solutions are found, so the returned count is at most limit
+  #   (such as limit=2 to only know if a puzzle has 0, 1, or many solutions).
+  def count_solutions(self, greenMaskAll, lettersAll, limit=0):
+    return len(self.find_solutions(greenMaskAll, lettersAll, limit)[1])
+
+
+
+  # Returns (swaps, swapList) for the fewest swaps that turn lettersAll into solution
+  #   (see solve() for swapList).
+  def optimal_swaps(self, greenMaskAll, lettersAll, solution):
+
+    swapCounter = SwapCounter(greenMaskAll, lettersAll, solution, self.cycleSearch)
+
+    swaps = 0
+    swaps += swapCounter.swapToTwoGreens()
+    swaps += swapCounter.swapSafe()
+    swaps += swapCounter.swapForcedSameSource()
+    swaps += swapCounter.swapToTwoGreens()   # swapToTwoGreens must be called immediately before findCyclesToGetMinSwaps
+    swaps += swapCounter.findCyclesToGetMinSwaps()
+
+    return swaps, swapCounter.swapList
+
+
+
+  # Returns (wordListAll, solutions), where wordListAll has the possible (frequency, word) of each word.
+  # If limit is not 0, the search stops as soon as limit solutions are found.
+  def find_solutions(self, greenMaskAll, lettersAll, limit=0):
+
+    #################################################
+    ###### prepare
+    #################################################
+
+    # check what the code below cannot check by itself
+    if not isinstance(greenMaskAll, str) or not isinstance(lettersAll, str):
+      raise ValueError("greenMaskAll and lettersAll must be strings!")
+    if not greenMaskAll.strip():
+      raise ValueError("greenMaskAll is empty!")
+    for i in greenMaskAll + lettersAll:
+      if i.isalpha() and not i.isascii():
+        raise ValueError("only the letters a to z can be used!")
+
+    # get number of letters per word (n1 and n2)
+    n1 = len(greenMaskAll.split()[0])    # length of horizontal words
+    n2 = len(greenMaskAll.split('\n'))   # length of vertical words
+
+    if n1 < 3 or not n1&1 or n2 < 3 or not n2&1:
+      raise ValueError("only odd sizes greater than 1!")
+
+    # useful
+    half = n2//2 + 1         # the number of horizontal words
+    halfVer = n1//2 + 1      # the number of vertical words
+    full = (n1 + n2)//2 + 1   # the number of words
+    n1p = n1+1
+
+    # make blank board
+    temp = "." * n1 + "\n" + ". " * (n1//2) + ".\n"
+    blank = temp * (n2//2) + "." * n1
+
+    # check for consistency
+    if len(greenMaskAll) != n2*n1p-1:
+      raise ValueError("greenMaskAll has an invalid shape!")
+    if len(greenMaskAll) != len(lettersAll):
+      raise ValueError("len(greenMaskAll) does not match len(lettersAll)!")
+    for i in range(len(greenMaskAll)):
+      if greenMaskAll[i].isalpha() and lettersAll[i] != greenMaskAll[i]:
+        raise ValueError("greenMaskAll does not match lettersAll!")
+    for i in range(len(greenMaskAll)):   # check against structure of blank
+      a =  blank[i] == " " and (greenMaskAll[i] != " " or lettersAll[i] != " ")
+      b =  blank[i] == "\n" and (greenMaskAll[i] != "\n" or lettersAll[i] != "\n")
+      c =  blank[i] == "." and not (greenMaskAll[i] == "." or greenMaskAll[i].isalpha())
+      d =  blank[i] == "." and not lettersAll[i].isalpha()
+      if a or b or c or d:
+        raise ValueError("invalid input!")
+
+    wordList1 = self.word_list(n1)
+    wordList2 = self.word_list(n2)
+
+    # make countsAll
+    countsAll = {}
+    goodLetters = lettersAll.replace(' ', '').replace('\n', '').lower()
+    for i in 'abcdefghijklmnopqrstuvwxyz':
+      countsAll[i] = goodLetters.count(i)
+
+
+    #################################################
+    ###### find the possibilities for each of the words
+    #################################################
+
+    wordListAll = []
+    for wordNum in range(full):
+
+      # take the correct slice and get the correct word list
+      if wordNum < half:   # horizontal words
+        start = 2 * wordNum * n1p
+        greenMask = greenMaskAll[ start : start+n1 ]
+        letters = lettersAll[ start : start+n1 ]
+        data, wordArrays, isFrequencyMap = wordList1
+      else:
+        start = 2 * (wordNum - half)
+        greenMask = greenMaskAll[ start :: n1p ]
+        letters = lettersAll[ start :: n1p ]
+        data, wordArrays, isFrequencyMap = wordList2
+
+      counts, letterList = word_constraints(greenMaskAll, countsAll, greenMask, letters)
+
+      # the possible words only depend on these
+      key = (greenMask, letters, tuple(counts.values()))
+      if key in self.candidateCache:
+        wordListAll.append(self.candidateCache[key])
+        continue
+
+      wordList = []
+      for word in filter_words(wordArrays, greenMask, counts, letterList):
+        wordList.append((data[word] if isFrequencyMap else 1, word))
+      wordListAll.append(wordList)
+
+      if len(self.candidateCache) >= self.candidateCacheSize:
+        self.candidateCache.clear()
+      self.candidateCache[key] = wordList
+
+
+    # remove words that cannot cross the possible crossing words
+    # (horizontal word h and vertical word v share index 2*v of h and index 2*h of v)
+    crossings = []
+    for h in range(half):
+      for v in range(halfVer):
+        crossings.append((h, 2*v, half + v, 2*h))
+        crossings.append((half + v, 2*h, h, 2*v))
+    prune_crossings(wordListAll, crossings)
+
+    solutions = []
+
+    #################################################
+    ###### see which combinations work to get solution
+    #################################################
+
+    # The words are chosen in whatever order is fastest: next is always the word with
+    #   the fewest possible words that agree with the letters of the crossing words already chosen.
+    # Horizontal word h and vertical word v share the letter at index 2*v of h and index 2*h of v.
+    #
+    # So that no strings, lists, or dictionary lookups are made for every possible word...
+    #   a word is its number (its index in wordListAll[wordNum]),
+    #   the words of wordListAll[wordNum] are the rows of bytes rows[wordNum]
+    #     (letter k of word i is the ASCII code rows[wordNum][i*length + k]),
+    #   and letters are looked up by their ASCII codes in lists of 128.
+
+    rows = ["".join([word for _,word in wordList]).encode("ascii") for wordList in wordListAll]
+    lengthOf = [n1] * half + [n2] * halfVer
+
+    bitsOf = [word_bits(rows[wordNum], lengthOf[wordNum]) for wordNum in range(full)]
+    allBits = [(1 << len(wordList)) - 1 for wordList in wordListAll]
+
+    crossOf, newIndicesOf = self.crossings(n1, n2)
+
+    chosen = [-1] * full   # the number of the word chosen for each word so far (-1 if not chosen yet)
+
+    lettersLeft = [0] * 128   # the letters not yet used by the words in loop_recursive()
+    for l, count in countsAll.items():
+      lettersLeft[ord(l)] = count
+
+    def loop_recursive(numChosen):
+
+      if numChosen < full:
+
+        # choose the word that has the fewest possible words
+        bestCount = -1
+        for wordNum in range(full):
+          if chosen[wordNum] < 0:
+            bits = allBits[wordNum]
+            crossed = 0
+            for k, other, kOther, crossBit in crossOf[wordNum]:
+              if chosen[other] >= 0:
+                bits &= bitsOf[wordNum][k][rows[other][chosen[other]*lengthOf[other] + kOther]]
+                crossed |= crossBit
+            count = bits.bit_count()
+            if bestCount < 0 or count < bestCount:
+              bestCount, best, bestBits, bestCrossed = count, wordNum, bits, crossed
+        wordNum, bits = best, bestBits
+
+        # the indices of the letters that are not shared with words already chosen
+        newIndices = newIndicesOf[wordNum][bestCrossed]
+        row = rows[wordNum]
+        length = lengthOf[wordNum]
+
+        while bits:
+          i = (bits & -bits).bit_length() - 1   # the lowest bit
+          bits &= bits - 1
+          start = i * length
+
+          # use up the letters of the word, skipping the word if it needs more of some letter than the puzzle has
+          fits = True
+          for k in newIndices:
+            l = row[start + k]
+            lettersLeft[l] -= 1
+            if lettersLeft[l] < 0:
+              fits = False
+          if fits:
+            chosen[wordNum] = i
+            loop_recursive(numChosen + 1)
+            chosen[wordNum] = -1
+          for k in newIndices:
+            lettersLeft[row[start + k]] += 1
+          if limit and len(solutions) >= limit:   # stop early
+            return
+
+      else:    # every word is chosen
+
+        # Every letter of the waffle was used up by exactly one word (the first chosen of the words
+        #   that share it), and no letter was used more times than the puzzle has,
+        #   so the letters of the words are the letters of the puzzle.
+
+        # Word on top is 0, and the vertical word on the left is 1.
+        # It keeps alternating between horizontal and vertical, using '' after one kind runs out.
+        w = []
+        for i in range(max(half,halfVer)):
+          w.append(wordListAll[i][chosen[i]][1] if i < half else '')
+          w.append(wordListAll[half + i][chosen[half + i]][1] if i < halfVer else '')
+
+        solutions.append(''.join(["\n"+" ".join( [w[j][i] for j in range(1,n1p,2)] )+"\n" if i&1 else w[i] for i in range(n2)]))
+
+    if all(wordListAll):
+      loop_recursive(0)
+
+    return wordListAll, solutions
+
+
+
+# For the words in a row of bytes (see loop_recursive()), returns bits[k][letter], which has bit i set
+#   if word i has letter (an ASCII code) at index k
+def word_bits(row, length):
+  numWords = len(row) // length
+  bits = []
+  for k in range(length):
+    bitArrays = {}
+    for i,l in enumerate(row[k::length]):
+      bitArrays.setdefault(l, bytearray((numWords + 7) // 8))[i >> 3] |= 1 << (i & 7)
+    table = [0] * 128
+    for l,b in bitArrays.items():
+      table[l] = int.from_bytes(b, 'little')
+    bits.append(table)
+  return bits
+
+
+
+# Returns (counts, letterList) for filter_words() for one word of a puzzle.
+#   greenMask and letters are the slices of greenMaskAll and lettersAll for the word
+def word_constraints(greenMaskAll, countsAll, greenMask, letters):
+
+  nl = len(letters)
+
+  # make counts
+  counts = countsAll.copy()
+  for i in 'abcdefghijklmnopqrstuvwxyz':
+    greensInOtherWords = greenMaskAll.count(i) - greenMask.count(i)
+    counts[i] = counts[i] - greensInOtherWords
+  for i in letters:
+    if i.islower() and i not in greenMask and i.upper() not in letters:
+      counts[i] = 0
+
+  # make wordNoGreen
+  wordNoGreen = list(letters)
+  for k in range(nl):
+    if letters[k]==greenMask[k]:
+      wordNoGreen[k] = '.'
+  wordNoGreen = "".join(wordNoGreen)
+
+  # letterList[] = [ [letter, badLocations, countMin, countMax] , ...]
+  letterList = []
+
+  for i,j in enumerate(letters):   # j is a letter
+
+      # is j the first yellow of that letter in the word?
+      if j.isupper() and j not in letters[:i]:
+
+        count = letters.count(j)  # yellows for now; greens added next
+        for k in range(nl):
+          if letters[k]==j.lower() and letters[k]==greenMask[k]:
+            count += 1
+
+        # assume that the other word has not had all of its other letters solved
+        countEven = letters[0::2].count(j)   # yellows that could be part of another word instead
+
+        badLocations = [k for k in range(nl) if wordNoGreen.upper()[k] == j]
+
+        if j.lower() in wordNoGreen:   # if there is a grey of the letter
+          letterList.append([ j.lower(), badLocations, count - countEven, count ])
+        else:
+          letterList.append([ j.lower(), badLocations, count - countEven, counts[j.lower()] ])
+
+      # is j is a green with no yellows of the same letter
+      elif j==greenMask[i] and j.upper() not in letters:
+
+        # we only need the first green in word
+        if j in greenMask[:i]:
+          continue
+
+        # we only care if we learn that there aren't any more of the letter in the word
+        if j in wordNoGreen:
+
+          count = 0
+          for k in range(nl):
+            if letters[k]==j and letters[k]==greenMask[k]:
+              count += 1
+
+          letterList.append([ j, [], count, count ])
+
+  return counts, letterList
+
+
+
+# The swap-counting functions, which work on the letters that are not yet green.
+# Instead of printing each swap, it is appended to swapList as a pair of indices of greenMaskAll
+#   (waffle.py prints them).
+class SwapCounter:
+
+  def __init__(self, greenMaskAll, lettersAll, solution, cycleSearch="letters"):
+
+    # remove greens and other garbage from solution and lettersAll, and create waffleIndices[]
+    self.waffleIndices = []
+    solution_list = []
+    letters_list = []
+    for i in range(len(greenMaskAll)):
+      if not greenMaskAll[i].isalpha() and lettersAll[i].isalpha():
+        self.waffleIndices.append(i)
+        solution_list.append(solution[i])
+        letters_list.append(lettersAll[i].lower())
+
+    self.solution_list = solution_list
+    self.letters_list = letters_list
+
+    self.counts = {}
+    for i in solution_list:
+      self.counts[i] = solution_list.count(i)
+
+    self.swapList = []
+    self.findCyclesOfGroup = findLetterCyclesOfGroup if cycleSearch == "letters" else findCyclesOfGroup
+
+
+  def recordSwap(self, i, j):
+    i = self.waffleIndices[i]
+    j = self.waffleIndices[j]
+    self.swapList.append((min(i, j), max(i, j)))
+
+
+
+  # Does swaps that make 2 new greens. This is optional but can GREATLY speed up the permutation part of the code.
+  def swapToTwoGreens(self):
+    solution_list, letters_list, counts = self.solution_list, self.letters_list, self.counts
+
+    swaps = 0
+
+    indices = []   # for marking indices that are already solved
+    for i in range(len(solution_list)):
+      for j in range(i+1, len(solution_list)):
+        if i in indices or j in indices:
+          continue
+        if solution_list[j] == letters_list[i] and solution_list[i] == letters_list[j]:
+          indices.append(i)
+          indices.append(j)
+          self.recordSwap(i, j)
+          swaps += 1
+
+    indices.sort(reverse=True)
+    for ind in indices:
+
+      # update counts
+      letter = solution_list[ind]
+      if counts[letter] == 1:
+        counts.pop(letter)
+      else:
+        counts[letter] -= 1
+
+      # remove from lists
+      solution_list.pop(ind)
+      letters_list.pop(ind)
+      self.waffleIndices.pop(ind)
+
+    return swaps
+
+
+
+  # The following is optional but safe. It will speed up the permutation part of the code.
+  # Does all swaps that swap a letter to its correct position if there is only one swappable instance of that letter
+  def swapSafe(self):
+    solution_list, letters_list, counts = self.solution_list, self.letters_list, self.counts
+
+    swaps = 0
+
+    toDelete = []   # for marking letters that are already solved
+    for letter in counts:
+      if counts[letter] == 1:
+
+        i = solution_list.index(letter)
+        j = letters_list.index(letter)
+
+        if i!=j:
+          self.recordSwap(i, j)
+          swaps += 1
+          letters_list[j] = letters_list[i]   # swap; no need to update letters_list[i] because it will be deleted
+
+        # remove the now green letter
+        toDelete.append(letter)
+        solution_list.pop(i)
+        letters_list.pop(i)
+        self.waffleIndices.pop(i)
+
+    for letter in toDelete:
+      counts.pop(letter)
+
+    # cleanup a bit
+    for i in range(len(letters_list)-1, -1, -1):
+      if letters_list[i] == solution_list[i]:  # if puzzle equals solution
+        if counts[letters_list[i]] == 1:
+          counts.pop(letters_list[i])
+        else:
+          counts[letters_list[i]] -= 1
+        letters_list.pop(i)
+        solution_list.pop(i)
+        self.waffleIndices.pop(i)
+
+    return swaps
+
+
+
+  # The following is optional but safe.
+  # If every remaining target spot for a letter contains the same wrong letter,
+  # then all instances of that letter can be swapped into their correct positions.
+  #
+  # Example:
+  #   solution_list has A A in two spots
+  #   letters_list  has B B in those same spots
+  # Then every A can safely be swapped into one of those A-spots.
+  def swapForcedSameSource(self):
+    solution_list, letters_list, counts = self.solution_list, self.letters_list, self.counts
+
+    swaps = 0
+
+    def rebuildCounts():
+      counts.clear()
+      for letter in solution_list:
+        if letter in counts:
+          counts[letter] += 1
+        else:
+          counts[letter] = 1
+
+    def cleanupGreens():
+      # remove any letters that are already solved
+      for i in range(len(letters_list)-1, -1, -1):
+        if letters_list[i] == solution_list[i]:
+          letters_list.pop(i)
+          solution_list.pop(i)
+          self.waffleIndices.pop(i)
+
+      rebuildCounts()
+
+    # make sure counts is accurate
+    rebuildCounts()
+
+    while True:
+
+      didSomething = False
+
+      for letter in list(counts):
+
+        # swapSafe() already handles letters with only one remaining instance
+        if counts[letter] <= 1:
+          continue
+
+        targetIndices = [i for i in range(len(solution_list)) if solution_list[i] == letter]
+
+        # This trick only works if all target locations contain the same wrong letter.
+        targetLetters = set(letters_list[i] for i in targetIndices)
+        if len(targetLetters) != 1:
+          continue
+
+        sourceLetter = next(iter(targetLetters))
+        if sourceLetter == letter:
+          continue
+
+        sourceIndices = [i for i in range(len(letters_list)) if letters_list[i] == letter]
+        if len(sourceIndices) != len(targetIndices):
+          continue
+
+        # The pairing does not matter because all target locations contain sourceLetter.
+        for i, j in zip(targetIndices, sourceIndices):
+          self.recordSwap(i, j)
+          swaps += 1
+          letters_list[j] = letters_list[i]
+          letters_list[i] = letter
+
+        cleanupGreens()
+        didSomething = True
+        break   # restart because the lists and counts have changed
+
+      if not didSomething:
+        break
+
+    return swaps
+
+
+
+  # Finds the most cycles after splitting the remaining letters into groups that never interact.
+  # Assumes swapToTwoGreens() was called immediately before this function, so no 2-cycles remain.
+  #
+  # For example, if the misplaced letters involving A, B, and C never involve D, E, or F,
+  #   then the two groups are solved separately and their swaps are added.
+  # Two small searches are much faster than one big search because the number of
+  #   cycles grows very quickly with the number of letters.
+  def findCyclesToGetMinSwaps(self):
+    solution_list, letters_list = self.solution_list, self.letters_list
+
+    leng = len(letters_list)
+    if leng == 0:
+      return 0
+
+    ### split into groups of letters
+
+    groupOf = {}   # {letter: another letter in the same group}, which eventually leads to the group's main letter
+
+    def findGroup(letter):
+      while groupOf.setdefault(letter, letter) != letter:
+        letter = groupOf[letter]
+      return letter
+
+    for i in range(leng):
+      groupOf[findGroup(letters_list[i])] = findGroup(solution_list[i])
+
+    groups = {}    # {main letter of group: [indices of letters_list in that group]}
+    for i in range(leng):
+      groups.setdefault(findGroup(letters_list[i]), []).append(i)
+
+    ### solve each group
+
+    best = []   # the best cycles of all groups
+    for indices in groups.values():
+      best += self.findCyclesOfGroup([letters_list[i] for i in indices], [solution_list[i] for i in indices])
+
+    ### record the swaps of each cycle
+
+    combined = list(zip(letters_list, solution_list))
+    for cyc in best:
+
+      indexList = []
+      for j in cyc:
+        indexList.append(combined.index(j))
+
+      pivotIndex = indexList[0]
+      for ind in indexList[1:]:
+        self.recordSwap(pivotIndex, ind)
+
+      for j in sorted(indexList, reverse=True):
+        combined.pop(j)
+        self.waffleIndices.pop(j)
+
+    return leng - len(best)      # each cycle takes its length minus 1 swaps
+
+
+
+# Returns the most cycles that can fix every letter in a group exactly once.
+# letters_group and solution_group are the group's letters from letters_list and solution_list.
+
+def findCyclesOfGroup(letters_group, solution_group):
+
+  leng = len(letters_group)
+
+
+  ### find and print all the cycles
+
+  def canonicalCycle(cyc):
+    # A cycle can be written starting from any point.
+    # This gives one standard version so repeats can be checked with a set.
+    cycTuple = tuple(cyc)
+    return min(cycTuple[i:] + cycTuple[:i] for i in range(len(cycTuple)))
+
+
+  def loop_recursive_cycles(cyc, depth, history):
+    # "globals": n, leng, cycles_seen, and cyclesGood
+
+    # did you find a cycle that has not yet been found?
+    if cyc[-1][0] == cyc[0][1]:
+      key = canonicalCycle(cyc)
+      if key not in cycles_seen:
+        cycles_seen.add(key)
+        cyclesGood.append(cyc[:])
+      return
+
+    if depth < leng - n:
+
+      for j in zip(letters_group[n+1:], solution_group[n+1:]):
+
+        if j[1] != cyc[-1][0] or j[0] in history:
+          continue
+
+        loop_recursive_cycles(cyc + [j], depth+1, history | {j[0]})
+
+
+  cycles_seen = set()  # to not collect repeats
+  cyclesGood = []      # will list all the cycles
+
+  for n, i in enumerate(zip(letters_group[:-1], solution_group[:-1])):
+    loop_recursive_cycles([i], 1, {i[0]})
+
+  # sort by length to speed up later code a bit
+  cyclesGood = sorted(cyclesGood, key=len)
+
+  # optionally print cycles
+  #for cyc in cyclesGood:
+  #  print()
+  #  print("".join([i[0] for i in cyc]))
+  #  print("".join([i[1] for i in cyc]))
+
+
+
+  ### go through cycles and fit them together in every possible way
+
+  # Which cycle is used first does not matter, so only the cycles containing the first remaining
+  #   (letter, correct letter) pair need to be tried. This makes the most cycles possible depend
+  #   only on the multiset of pairs that remain, so it is remembered for every multiset that is reached.
+  # The multiset is stored as a tuple of how many of each distinct pair remain.
+
+  pairs = sorted(set(zip(letters_group, solution_group)))
+  pairIndex = {j: k for k, j in enumerate(pairs)}
+  pairLetters = [j[0] for j in pairs]
+
+  cyclesWithPair = [[] for j in pairs]   # the cycles (as indices of cyclesGood) that contain each pair
+  for index, cyc in enumerate(cyclesGood):
+    for j in cyc:
+      cyclesWithPair[pairIndex[j]].append(index)
+
+  # If swapToTwoGreens() has already removed all 2-cycles, then every remaining cycle
+  # has length at least 3. If you are not 100% sure of that, change this to 2.
+  minCycleLengthLeft = 3
+
+  def most_cycles_bound(currentSituation):
+    # Branch-and-bound: even in the best case, the remaining pairs can create at most this many cycles.
+    # A cycle never passes through the same letter twice, so the cycles through the most common
+    #   letter (one for each of its D pairs, at most) each also use at least minCycleLengthLeft-1 pairs
+    #   of other letters, and every other cycle uses at least minCycleLengthLeft pairs of other letters.
+    total = sum(currentSituation)
+    degrees = {}
+    for k, count in enumerate(currentSituation):
+      degrees[pairLetters[k]] = degrees.get(pairLetters[k], 0) + count
+    D = max(degrees.values())
+    cyclesThroughD = min(D, (total - D) // (minCycleLengthLeft - 1))
+    return (total - D + cyclesThroughD) // minCycleLengthLeft
+
+  memo = {}   # {currentSituation: (most cycles, index of the first cycle to use)}
+
+  def loop_recursive_combine_cycles(currentSituation):
+    # "globals": memo
+    # returns the most cycles that use up currentSituation (or -1 if impossible)
+
+    # did you complete the puzzle?
+    if not any(currentSituation):
+      return 0
+
+    if currentSituation in memo:
+      return memo[currentSituation][0]
+
+    first = next(k for k, count in enumerate(currentSituation) if count)
+
+    best = (-1, None)
+    for index in cyclesWithPair[first]:   # cyclesGood is sorted by length, so short cycles are tried first
+
+      currentSituationNew = list(currentSituation)
+      for j in cyclesGood[index]:
+        currentSituationNew[pairIndex[j]] -= 1
+      if min(currentSituationNew) < 0:
+        continue   # cyc could not be removed
+      currentSituationNew = tuple(currentSituationNew)
+
+      if 1 + most_cycles_bound(currentSituationNew) <= best[0]:
+        continue
+
+      total = 1 + loop_recursive_combine_cycles(currentSituationNew)
+      if total > best[0]:
+        best = (total, index)
+
+    memo[currentSituation] = best
+    return best[0]
+
+
+  # convert to a different data structure
+  currentSituation = [0] * len(pairs)
+  for j in zip(letters_group, solution_group):
+    currentSituation[pairIndex[j]] += 1
+  currentSituation = tuple(currentSituation)
+
+  loop_recursive_combine_cycles(currentSituation)
+
+  # follow the remembered choices
+  best = []   # best list of cycle indices
+  while any(currentSituation):
+    index = memo[currentSituation][1]
+    best.append(index)
+    currentSituationNew = list(currentSituation)
+    for j in cyclesGood[index]:
+      currentSituationNew[pairIndex[j]] -= 1
+    currentSituation = tuple(currentSituationNew)
+
+  return [cyclesGood[i] for i in best]
+
+
+
+
+
+
+
+
+# Returns the most cycles that can fix every letter in a group exactly once, like findCyclesOfGroup(),
+#   but this searches cycles of letters instead of cycles of locations.
+#
+# Locations that have the same current letter and the same correct letter are interchangeable,
+#   which findCyclesOfGroup() does not know, so it tries every way of swapping them around.
+# Instead, think of each location as an arrow from its correct letter to its current letter.
+# Only the number of arrows between each two letters matters (at most 26x26 numbers).
+# Every cycle of letters is found once, then the cycles are fit together to use up every arrow,
+#   remembering the most cycles for every set of remaining arrows that has already been seen.
+# Each cycle of letters is then turned back into a cycle of (letter, correct letter) pairs.
+
+def findLetterCyclesOfGroup(letters_group, solution_group):
+
+  # count the arrows
+  arrowCounts = {}
+  for pair in zip(solution_group, letters_group):
+    arrowCounts[pair] = arrowCounts.get(pair, 0) + 1
+  arrows = sorted(arrowCounts)
+  arrowIndex = {arrow: k for k, arrow in enumerate(arrows)}
+
+  nextLetters = {}
+  for a, b in arrows:
+    nextLetters.setdefault(a, []).append(b)
+
+
+  ### find all the cycles of letters
+
+  cycles = []   # [ [letters of cycle], ... ]
+
+  def loop_recursive_cycles(cyc):
+    # to find each cycle once, every cycle starts with its smallest letter
+    for b in nextLetters.get(cyc[-1], []):
+      if b == cyc[0]:
+        cycles.append(cyc)
+      elif b > cyc[0] and b not in cyc:
+        loop_recursive_cycles(cyc + [b])
+
+  for a in nextLetters:
+    loop_recursive_cycles([a])
+
+  # for each arrow, list the cycles that use it as [ (cycle number, [indices of the cycle's arrows]), ... ]
+  cyclesWithArrow = [[] for _ in arrows]
+  for c, cyc in enumerate(cycles):
+    indices = [arrowIndex[(cyc[i-1], cyc[i])] for i in range(1, len(cyc))] + [arrowIndex[(cyc[-1], cyc[0])]]
+    for k in indices:
+      cyclesWithArrow[k].append((c, indices))
+
+
+  ### fit the cycles together
+
+  memo = {}   # {remaining arrow counts: (most cycles, the cycle to use first)}
+
+  def most_cycles(counts):
+
+    if counts in memo:
+      return memo[counts][0]
+
+    # The first remaining arrow has to be used by some cycle, so only those cycles are tried.
+    # This prevents trying the same cycles in a different order.
+    first = 0
+    while first < len(counts) and not counts[first]:
+      first += 1
+    if first == len(counts):   # every arrow is used up
+      return 0
+
+    best = (-len(counts), None)   # worse than anything (though a cycle always fits)
+    for c, indices in cyclesWithArrow[first]:
+      if all(counts[k] for k in indices):
+        countsNew = list(counts)
+        for k in indices:
+          countsNew[k] -= 1
+        total = 1 + most_cycles(tuple(countsNew))
+        if total > best[0]:
+          best = (total, c)
+
+    memo[counts] = best
+    return best[0]
+
+  counts = tuple(arrowCounts[arrow] for arrow in arrows)
+  most_cycles(counts)
+
+
+  ### convert to cycles of (letter, correct letter) pairs like findCyclesOfGroup() returns
+
+  best = []
+  while any(counts):
+    cyc = cycles[memo[counts][1]]
+    best.append([(cyc[(i+1) % len(cyc)], cyc[i]) for i in range(len(cyc))])
+
+    countsNew = list(counts)
+    for i in range(len(cyc)):
+      countsNew[arrowIndex[(cyc[i], cyc[(i+1) % len(cyc)])]] -= 1
+    counts = tuple(countsNew)
+
+  return best
+
+
+
+# The old way of finding the fewest swaps, which tries every way of deciding which copy of
+#   a repeated letter goes where. It is much slower than the cycle search, so it is not used.
+# It was written for the old waffle.py, where solution_list, letters_list, counts, and
+#   printSwap() were global (see SwapCounter), and it needs the following import and function.
+
+'''
+# The following import is only needed if using permuteToGetMinSwaps(),
+#   which is not the default.
+# Note that product(*perms) where perms is a list of permutations could use a lot of RAM,
+#   so I don't import product from itertools
+# Instead, I do the product myself using a recursive function that loops over permutations.
+from itertools import permutations
+
+
+# The following import and function are needed only if using permuteToGetMinSwaps()
+#    https://stackoverflow.com/a/5419576
+from collections import defaultdict
+
+def list_duplicates(seq):
+    tally = defaultdict(list)
+    for i,item in enumerate(seq):
+        tally[item].append(i)
+    return (locs for key,locs in tally.items() if len(locs)>1)
+'''
+
+
+
+'''
+# If no duplicates, you just mindlessly move things to where they belong and you'll get the optimal number of swaps.
+# Functions for this, minSwapsToSort() and minSwapToMakeArraySame(), are below.
+# The above swapSafe() would also do it.
+#
+# With duplicates, the problem is harder...
+#   https://stackoverflow.com/questions/18292202/finding-the-minimum-number-of-swaps-to-convert-one-string-to-another-where-the
+#
+# Let's say there are 3 r's in solution_list. I will instead call them r0, r1, and r2 in solution_list.
+# Then I will make many versions of letters_list (called letters) that have permutations of r0, r1, and r2.
+# Then, I use the above no-duplicate code for each version of letters_list until I find an optimal one!
+# The coding of this is lengthy because there could be many different letters that are repeated.
+#
+# Modifies solution_list a bit by adding numbers after the letters then clobbering it.
+# Requires letters_list and counts.
+
+def permuteToGetMinSwaps():
+  global bestSwaps, best    # these are what this function "returns"
+
+
+  #   https://www.geeksforgeeks.org/minimum-number-swaps-required-sort-array/
+  #  Duplicates are not allowed
+
+  def minSwapsToSort(arr, n, mp, printBool):
+    ans = 0
+    temp = arr.copy()
+    h = {}
+    temp.sort()
+    for i in range(n):
+        h[arr[i]] = i
+    init = 0
+    if printBool:
+      keyList = list(mp.keys())
+      valueList = list(mp.values())
+    for i in range(n):
+        if (arr[i] != temp[i]):
+            ans += 1
+            init = arr[i]
+            new = h[temp[i]]
+            arr[i], arr[new] = arr[new], arr[i]
+            if printBool:
+              #print( [keyList[valueList.index(j)] for j in arr] )
+              printSwap(keyList[valueList.index(arr[i])], keyList[valueList.index(arr[new])] , new, i)
+            h[init] = new
+            h[temp[i]] = i
+    return ans
+
+
+
+  #   https://www.geeksforgeeks.org/minimum-swaps-to-make-two-array-identical/
+
+  def minSwapToMakeArraySame(a, b, n, printBool):
+    mp = {}
+    for i in range(n):
+        mp[b[i]] = i
+    for i in range(n):
+        b[i] = mp[a[i]]
+    return minSwapsToSort(b, n, mp, printBool)
+
+
+  # To speed up the code for many hard puzzles, create get_puz_from_sol[] and ind_of_puz[].
+  # These let you remove duplicate permutations.
+  # If AABBCC is the puzzle with solution BBCCAA, the code would otherwise check 8 permutations,
+  #   but there really is only 1 that is needed, hence the need for ways to check for repeats.
+  #   Note that, since permutations grow factorially, this can really help!
+  # The following will have the same sizes as permStarts[] and p[]...
+  get_puz_from_sol = []
+  ind_of_puz = []   # also, just generally useful for speeding up the code
+
+
+  permStarts = []
+  solution_list_old = solution_list[:]
+  for letter,count in counts.items():
+
+    # I can't make a list of permutations themselves because they are generators
+    #   that can only be used once.
+    #   I wonder if itertools' cycle(permutations()) would be faster??
+    permStarts.append( tuple([ letter+str(i) for i in range(count) ]) )
+
+    # Modify solution_list and append to get_puz_from_sol
+    ind = 0
+    temp = ''  # to be appended to get_puz_from_sol
+    for i in range(count):
+      for j in range(ind, len(solution_list)):
+        if solution_list[j]==letter:
+          ind = j
+          break
+      temp += letters_list[ind]
+      solution_list[ind] = letter + str(i)   # now duplicate letters are numbered
+    get_puz_from_sol.append(temp)
+
+
+    # append to ind_of_puz[]
+    temp = []
+    ind = -1
+    for i in range(count):
+
+      # find the index, ind
+      for j in range(ind+1, len(letters_list)):
+        if letters_list[j]==letter:
+          ind = j
+          break
+
+      temp.append(ind)
+
+    ind_of_puz.append(tuple(temp))
+
+
+
+  # Recursive function to handle the variable length of perms to loop through
+  def loop_recursive_perms(p, n):
+    global bestSwaps, best    # these are what this function "returns"
+
+    if n < len(permStarts):
+      for perm in permutations(permStarts[n]):
+
+        # to speed things up, prune this branch to avoid duplicate permutations
+        pairs = []
+        for i,l in enumerate(perm):   # create pairs[]
+          ind = int(l[1])
+          pairs.append(get_puz_from_sol[n][ind] + solution_list_old[ind_of_puz[n][i]])
+        stop = False
+        for dup in list_duplicates(pairs):
+          # insist that duplicate permutations be in increasing order; else stop
+          v = int(perm[dup[0]][1])
+          for k in dup[1:]:
+            vNew = int(perm[k][1])
+            if v > vNew:
+              stop = True
+              break
+            v = vNew
+          if stop:   # does this speed things up?
+            break
+        if stop:
+          continue
+
+        loop_recursive_perms(p + [perm], n + 1)
+
+    else:    # p is now a list of specific permutations
+
+      # create letters from letters_list, but now with specific permutations
+      letters = letters_list[:]
+      for perm in p:
+        ind = 0
+        for i in range(len(perm)):
+
+          # find the index, ind
+          for j in range(ind, len(letters)):
+            if letters[j]==perm[0][0]:
+              ind = j
+              break
+
+          letters[ind] = perm[i]
+
+      temp = letters[:]   # minSwapToMakeArraySame() clobbers letters[]
+      swapsTemp = minSwapToMakeArraySame( solution_list, letters, len(solution_list), False )
+
+      if swapsTemp < bestSwaps:
+        bestSwaps = swapsTemp
+        best = temp[:]
+
+
+  bestSwaps = 1000000    # any large enough number
+  loop_recursive_perms([], 0)
+
+  # print the bestSwaps swaps
+  minSwapToMakeArraySame( best, solution_list, len(solution_list), True )
+'''
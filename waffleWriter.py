@@ -0,0 +1,113 @@
+#!/usr/bin/env python3.11
+#
+# Write the waffles found by waffleGen.py and solidWaffleGen.py to a file.
+#
+# Printing every waffle (the grid plus its words) to a terminal is slow when millions
+#   of waffles are found, so the generators can instead write one line per waffle...
+#   aloft alarm ended frame tepee evade ...
+# which is the words of the waffle in the same order as the word list that is printed
+#   (horizontal and vertical words alternating, starting with the top word).
+# If the file name ends with .jsonl, each line is instead a JSON list of the words.
+# If the file name ends with .gz (such as waffles.jsonl.gz), the file is gzip compressed.
+#
+# A waffle is never written twice, even if it is found again by a resumed search.
+#   For square waffles, a waffle and its transpose count as the same waffle.
+# Every waffle written is remembered for this, which takes roughly 100 bytes per waffle.
+#
+# (c) 2023 Bradley Knockel
+
+
+import gzip
+import json
+import os
+
+
+bufferSize = 1 << 20   # bytes written at a time to a plain file
+
+
+
+class WaffleWriter:
+
+  # If append is True, the waffles already in the file are kept and are never written again.
+  #   (A last line cut off by an interruption is removed.)
+  def __init__(self, file, square, append=False):
+
+    self.file = file
+    self.square = square
+    self.jsonl = file.removesuffix(".gz").endswith(".jsonl")
+    self.written = set()
+    self.count = 0
+
+    if append and os.path.exists(file):
+      lines = self.read_lines()
+      for line in lines:
+        self.written.add(self.canonical(self.parse(line)))
+
+      # rewrite the complete lines so that new waffles are not appended to a broken file
+      with self.open(file + ".tmp", "w") as f:
+        f.writelines(lines)
+      os.replace(file + ".tmp", file)
+
+      self.f = self.open(file, "a")
+    else:
+      self.f = self.open(file, "w")
+
+
+  def open(self, file, mode):
+    if self.file.endswith(".gz"):
+      return gzip.open(file, mode + "t")
+    return open(file, mode, buffering=bufferSize)
+
+
+  # the complete lines of the file
+  def read_lines(self):
+    lines = []
+    try:
+      with self.open(self.file, "r") as f:
+        for line in f:
+          lines.append(line)
+    except EOFError:   # a gzip file that was not closed
+      pass
+    if lines and not lines[-1].endswith("\n"):
+      lines.pop()
+    return lines
+
+
+  def parse(self, line):
+    if self.jsonl:
+      return json.loads(line)
+    return line.split()
+
+
+  # the same string for a waffle and (if square) its transpose
+  def canonical(self, words):
+    key = " ".join(words)
+    if self.square:
+      transpose = " ".join(words[i ^ 1] for i in range(len(words)))   # swaps each horizontal and vertical pair
+      key = min(key, transpose)
+    return key
+
+
+  # w is the list of words from the generator (with '' for missing vertical words)
+  def write(self, w):
+
+    words = [word for word in w if word]
+
+    key = self.canonical(words)
+    if key in self.written:
+      return
+    self.written.add(key)
+
+    if self.jsonl:
+      self.f.write(json.dumps(words) + "\n")
+    else:
+      self.f.write(" ".join(words) + "\n")
+    self.count += 1
+
+
+  def flush(self):
+    self.f.flush()
+
+
+  def close(self):
+    self.f.close()
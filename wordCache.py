@@ -0,0 +1,151 @@
+#!/usr/bin/env python3.11
+#
+# Compile word-list files into a binary cache that loads in milliseconds.
+#
+# Every waffle script used to re-parse words_alpha.txt (~370k words),
+#   freq_map.json, or words#.json from scratch and then filter by length,
+#   which takes seconds and dominates the runtime of small puzzles.
+# Compiling a word-list file writes, for every word length in it...
+#   wordCache/<file>.<length>.words   fixed-width rows of ASCII bytes (one row per word)
+#   wordCache/<file>.<length>.freq    the parallel float64 frequency column
+# plus wordCache/<file>.json, which remembers the word counts and which version
+#   of the source file was compiled.
+#
+# To compile ahead of time (any of the usual word-list files can be given)...
+#   python3 wordCache.py words_alpha.txt freq_map.json words5.json
+# Otherwise, a file is compiled the first time it is loaded,
+#   and it is recompiled whenever the source file changes.
+#
+# A .txt file has no frequency data, so every frequency is stored as 1.
+#
+# (c) 2023 Bradley Knockel
+
+
+import json
+import os
+import sys
+from array import array
+from mmap import mmap, ACCESS_READ
+
+
+cacheFolder = "wordCache"
+
+# Frequencies are stored as float64 (like the floats of the .json files), so a frequency
+#   is never rounded to the other side of a freqCutoff, and ties sort the same with or without the cache.
+# Changing how the cache is stored must change cacheVersion so that old caches are recompiled.
+cacheVersion = 2
+
+
+
+# where the cache files for a word-list file go
+def cache_paths(file, length):
+  folder = os.path.join(os.path.dirname(file), cacheFolder)
+  name = os.path.join(folder, os.path.basename(file))
+  return name + "." + str(length) + ".words", name + "." + str(length) + ".freq"
+
+
+
+# what the cache remembers about the source file to know if it is stale
+def source_stamp(file):
+  info = os.stat(file)
+  return [info.st_size, info.st_mtime_ns]
+
+
+
+def read_meta(file):
+  folder = os.path.join(os.path.dirname(file), cacheFolder)
+  try:
+    with open(os.path.join(folder, os.path.basename(file) + ".json")) as f:
+      meta = json.load(f)
+  except (OSError, ValueError):
+    return False
+  if meta.get("source") != source_stamp(file) or meta.get("version") != cacheVersion:
+    return False
+  return meta
+
+
+
+# parse the source file then write every word length to the cache
+def compile_words(file):
+
+  # get (word, frequency) pairs in the order of the file
+  if file.endswith(".json"):
+    with open(file) as f:
+      pairs = json.load(f).items()
+  else:
+    with open(file) as f:
+      pairs = [(word, 1) for word in f.read().split()]
+
+  byLength = {}
+  for word, freq in pairs:
+    if not word.isascii():   # cannot be a fixed-width row of bytes (and cannot be in a waffle)
+      continue
+    byLength.setdefault(len(word), []).append((word, freq))
+
+  folder = os.path.join(os.path.dirname(file), cacheFolder)
+  os.makedirs(folder, exist_ok=True)
+
+  for length, entries in byLength.items():
+    wordsFile, freqFile = cache_paths(file, length)
+    with open(wordsFile, "wb") as f:
+      f.write("".join([word for word, _ in entries]).encode("ascii"))
+    with open(freqFile, "wb") as f:
+      array("d", [freq for _, freq in entries]).tofile(f)
+
+  # write the meta file last so that an interrupted compile is redone
+  meta = {"source": source_stamp(file), "version": cacheVersion, "counts": {str(k): len(v) for k, v in byLength.items()}}
+  with open(os.path.join(folder, os.path.basename(file) + ".json"), "w") as f:
+    json.dump(meta, f)
+
+  return meta
+
+
+
+# returns the memory-mapped rows and frequency column for words of a certain length
+#   (returns two empty byte strings if there are no such words)
+def map_words(file, length):
+
+  meta = read_meta(file)
+  if not meta:
+    meta = compile_words(file)
+
+  if not meta["counts"].get(str(length)):
+    return b"", b""
+
+  wordsFile, freqFile = cache_paths(file, length)
+  with open(wordsFile, "rb") as f:
+    rows = mmap(f.fileno(), 0, access=ACCESS_READ)
+  with open(freqFile, "rb") as f:
+    freqs = mmap(f.fileno(), 0, access=ACCESS_READ)
+
+  return rows, freqs
+
+
+
+# returns a list of all words of a certain length
+def load_words(file, length):
+  rows, _ = map_words(file, length)
+  text = rows[:].decode("ascii")
+  return [text[i : i+length] for i in range(0, len(text), length)]
+
+
+
+# returns a dictionary of {word: frequency} for all words of a certain length
+def load_frequencies(file, length):
+  _, freqs = map_words(file, length)
+  freqList = array("d")
+  freqList.frombytes(freqs[:])
+  return dict(zip(load_words(file, length), freqList))
+
+
+
+if __name__ == "__main__":
+
+  if len(sys.argv) < 2:
+    print("  Usage: python3 wordCache.py words_alpha.txt freq_map.json ...")
+    exit()
+
+  for file in sys.argv[1:]:
+    meta = compile_words(file)
+    total = sum(meta["counts"].values())
+    print("  Compiled", total, "words of", len(meta["counts"]), "lengths from", file)
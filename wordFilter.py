@@ -0,0 +1,138 @@
+#!/usr/bin/env python3.11
+#
+# Find the words in a word list that fit the colors of a word in a Waffle puzzle.
+#
+# This is the "search through all words in word list" step of waffle.py and waffleGen2.py.
+# Checking word after word with word.count() in pure Python is the bulk of the
+#   solve time for long word lists, so, if numpy is installed, the word list is
+#   instead stored as an (N, length) array of letters plus an (N, 26) array of
+#   letter counts, and each color constraint is applied to every word at once.
+# Without numpy, the original word-by-word loop is used.
+#
+# (c) 2023 Bradley Knockel
+
+
+# Importing numpy takes a good fraction of a second, which is longer than the
+#   word-by-word loop takes for short word lists, so numpy is only used for long lists.
+minNumpyWords = 5000
+
+np = None
+
+
+
+# Prepare a word list (all words having the same length) for filter_words().
+# Returns (words, letters, letterCounts), where the last two are None if not using numpy.
+def make_word_arrays(words):
+  global np
+
+  words = list(words)
+  if len(words) < minNumpyWords:
+    return words, None, None
+
+  if np is None:
+    try:
+      import numpy as np
+    except ImportError:
+      return words, None, None
+
+  length = len(words[0])
+  letters = np.frombuffer("".join(words).encode("ascii"), dtype=np.uint8).reshape(-1, length) - ord('a')
+
+  letterCounts = np.empty((len(words), 26), dtype=np.int16)
+  for i in range(26):
+    letterCounts[:, i] = (letters == i).sum(axis=1)
+
+  return words, letters, letterCounts
+
+
+
+# Returns the words that fit the constraints, in word-list order.
+#   greenMask is the word's green letters with '.' elsewhere
+#   counts is {letter: the max number of that letter in the word}
+#   letterList is [ [letter, badLocations, countMin, countMax] , ...]
+#     (or [ [letter, badLocations, countMax] , ...])
+def filter_words(wordArrays, greenMask, counts, letterList):
+
+  words, letters, letterCounts = wordArrays
+
+  if letters is None:
+    return [word for word in words if word_fits(word, greenMask, counts, letterList)]
+
+  # greenMask[]
+  good = np.ones(len(words), dtype=bool)
+  for k, g in enumerate(greenMask):
+    if g.isalpha():
+      good &= letters[:, k] == ord(g) - ord('a')
+
+  # counts[] (only letters that are in the word matter)
+  countMax = np.array([counts[chr(ord('a') + i)] for i in range(26)])
+  good &= ~((letterCounts > countMax) & (letterCounts > 0)).any(axis=1)
+
+  # letterList[]
+  for entry in letterList:
+    i = ord(entry[0]) - ord('a')
+    count = letterCounts[:, i]
+    if len(entry) == 4:
+      good &= count >= entry[2]
+    good &= count <= entry[-1]
+    for k in entry[1]:
+      good &= letters[:, k] != i
+
+  return [words[i] for i in np.flatnonzero(good)]
+
+
+
+# the word-by-word version of filter_words()
+def word_fits(word, greenMask, counts, letterList):
+
+  # greenMask[]
+  if any( g.isalpha() and g!=w for (g, w) in zip(greenMask, word)):
+    return False
+
+  # counts[]
+  if any(word.count(i)>counts[i] for i in word):
+    return False
+
+  # letterList[]
+  for entry in letterList:
+    count = word.count(entry[0])
+    if (len(entry) == 4 and count < entry[2]) or count > entry[-1] or entry[0] in [word[i] for i in entry[1]]:
+      return False
+
+  return True
+
+
+
+# Removes the words that no remaining word of a crossing word agrees with at their shared letter,
+#   then repeats for the crossing words of any word that lost words until nothing changes (arc consistency).
+#   wordLists is [ [(frequency, word), ...], ... ], and its pruned lists are replaced by new lists
+#   crossings is [ (wordNum, index, otherWordNum, otherIndex), ... ] where word wordNum's letter at index
+#     is word otherWordNum's letter at otherIndex (list each shared letter in both directions)
+# Each shared letter is checked with a 26-bit mask of the letters that the crossing word can still have there.
+def prune_crossings(wordLists, crossings):
+
+  neighbors = [[] for _ in wordLists]
+  for wordNum, index, otherWordNum, otherIndex in crossings:
+    neighbors[wordNum].append((index, otherWordNum, otherIndex))
+
+  toCheck = list(range(len(wordLists)))
+  while toCheck:
+    wordNum = toCheck.pop()
+
+    masks = [(index, letter_mask(wordLists[otherWordNum], otherIndex)) for index, otherWordNum, otherIndex in neighbors[wordNum]]
+    kept = [entry for entry in wordLists[wordNum] if all(mask >> (ord(entry[1][index]) - 97) & 1 for index, mask in masks)]
+
+    if len(kept) < len(wordLists[wordNum]):
+      wordLists[wordNum] = kept
+      for _, otherWordNum, _ in neighbors[wordNum]:
+        if otherWordNum not in toCheck:
+          toCheck.append(otherWordNum)
+
+
+
+# the letters that some word in wordList has at index (bit 0 is 'a')
+def letter_mask(wordList, index):
+  mask = 0
+  for entry in wordList:
+    mask |= 1 << (ord(entry[1][index]) - 97)
+  return mask
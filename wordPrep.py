@@ -0,0 +1,245 @@
+#!/usr/bin/env python3.11
+#
+# Reduce a word list for waffleGen.py and solidWaffleGen.py, and cache the result.
+#
+# Reducing the size of a word list is always crucial for the generators.
+# A word list (any file that wordCache.py can load) is reduced by...
+#   a frequency cutoff (words#.json and freq_map.json have frequencies; .txt files do not),
+#   a blocklist file of words to never use,
+#   an allowlist file of words to always use (even if they would otherwise be removed),
+#   forbiddenLetters (words with any of these letters are removed),
+#   and maxSameLetter (if not 0, words with more than this many of any one letter are removed).
+# The blocklist and allowlist files have words separated by whitespace (such as one per line).
+#
+# The reduced list and the generator's make_index() dictionary are saved to the wordCache
+#   folder next to the word-list file, in a file named by a hash of everything that went into them
+#   (the reduction settings, the versions of the files, and the code of make_index()).
+#   Rerunning a generator with the same settings loads this file instead of redoing the work.
+# Old cache files are never used again once a setting changes, so the wordCache folder
+#   can be deleted at any time to free up space.
+#
+# A dictionary of lists of words takes many times the RAM of the word list itself, so the
+#   dictionary is saved in a compact layout (like a compressed sparse row matrix)...
+#   the words as fixed-width rows of letters,
+#   the sorted keys (each key's letters joined together) and their uint32 offsets,
+#   and, for each key, the uint32 offset of its list in a uint32 array of word numbers.
+# The file is memory-mapped instead of read, so loading it is nearly instant,
+#   and processes using the same file (such as the workers of numProcesses, or several
+#   generators running at once) share one copy of it in RAM.
+# A MappedIndex is used like the dictionary (with get()), but each list of words is only
+#   made the first time it is needed.
+#
+# (c) 2023 Bradley Knockel
+
+
+import hashlib
+import json
+import os
+import struct
+from array import array
+from mmap import mmap, ACCESS_READ
+
+from wordCache import cacheFolder, cacheVersion, load_frequencies, source_stamp
+
+
+
+# Returns the words of a certain length that are kept, in the order of the file
+#   (then any allowlist words that are not in the file).
+def reduce_words(file, length, freqCutoff=0, blocklistFile="", allowlistFile="", forbiddenLetters="", maxSameLetter=0):
+
+  blocked = set(read_words(blocklistFile))
+  allowed = [word for word in dict.fromkeys(read_words(allowlistFile)) if len(word) == length and word not in blocked]
+  allowedSet = set(allowed)
+
+  words = []
+  for word, freq in load_frequencies(file, length).items():
+    if word in allowedSet:
+      words.append(word)
+      allowedSet.remove(word)
+    elif word in blocked or freq <= freqCutoff:
+      continue
+    elif any(letter in word for letter in forbiddenLetters):
+      continue
+    elif maxSameLetter and max(word.count(letter) for letter in set(word)) > maxSameLetter:
+      continue
+    else:
+      words.append(word)
+
+  words.extend(word for word in allowed if word in allowedSet)
+  return words
+
+
+
+def read_words(file):
+  if not file:
+    return []
+  with open(file) as f:
+    return f.read().split()
+
+
+
+# Returns (words, index), where words are from reduce_words() and index is a MappedIndex
+#   of make_index(words, length). The result is cached (see the top of this file).
+def prepare_words(file, length, make_index, freqCutoff=0, blocklistFile="", allowlistFile="", forbiddenLetters="", maxSameLetter=0):
+
+  config = {
+    "file": [os.path.basename(file), source_stamp(file)],
+    "wordCache": cacheVersion,
+    "length": length,
+    "freqCutoff": freqCutoff,
+    "blocklist": [blocklistFile, source_stamp(blocklistFile)] if blocklistFile else "",
+    "allowlist": [allowlistFile, source_stamp(allowlistFile)] if allowlistFile else "",
+    "forbiddenLetters": "".join(sorted(set(forbiddenLetters))),
+    "maxSameLetter": maxSameLetter,
+    "make_index": hashlib.sha256(code_bytes(make_index.__code__)).hexdigest(),
+  }
+  name = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+  folder = os.path.join(os.path.dirname(file), cacheFolder)
+  cacheFile = os.path.join(folder, os.path.basename(file) + "." + str(length) + "." + name + ".index")
+
+  if not os.path.exists(cacheFile):
+    words = reduce_words(file, length, freqCutoff, blocklistFile, allowlistFile, forbiddenLetters, maxSameLetter)
+    os.makedirs(folder, exist_ok=True)
+    write_index(cacheFile, words, length, make_index(words, length))
+
+  index = MappedIndex(cacheFile)
+  return index.words, index
+
+
+
+# a short hash of a word list, for knowing if a checkpoint is from a search of the same words
+def words_hash(words):
+  return hashlib.sha256("\n".join(words).encode()).hexdigest()[:16]
+
+
+
+# what a function's code does, for knowing when make_index() was changed
+#   (a code object inside of it, such as of a generator expression, would otherwise repr() as its address)
+def code_bytes(code):
+  parts = [code.co_code, repr(code.co_names).encode()]
+  for const in code.co_consts:
+    parts.append(code_bytes(const) if hasattr(const, "co_code") else repr(const).encode())
+  return b"".join(parts)
+
+
+
+# the bytes of a key of make_index() (a string, a tuple of letters, or a non-negative integer)
+def key_bytes(key):
+  if isinstance(key, int):
+    return key.to_bytes((key.bit_length() + 7) // 8, "big")
+  return "".join(key).encode("ascii")
+
+
+def padding(size):
+  return bytes(-size % 4)
+
+
+# File layout...
+#   header: numWords, length, numKeys, number of bytes of keys, number of word numbers (5 uint64)
+#   the words (padded to a multiple of 4 bytes)
+#   keyOffsets: uint32[numKeys + 1], where key k is keys[keyOffsets[k] : keyOffsets[k+1]]
+#   keys (padded to a multiple of 4 bytes)
+#   listOffsets: uint32[numKeys + 1], where the list of key k is wordNums[listOffsets[k] : listOffsets[k+1]]
+#   wordNums: uint32[...], in the order of the lists of make_index()
+def write_index(cacheFile, words, length, index):
+
+  wordNumber = {word: i for i, word in enumerate(words)}
+  keys = sorted(key_bytes(key) for key in index)
+  lists = {key_bytes(key): words for key, words in index.items()}
+
+  keyOffsets = array("I", [0])
+  listOffsets = array("I", [0])
+  wordNums = array("I")
+  for key in keys:
+    keyOffsets.append(keyOffsets[-1] + len(key))
+    wordNums.extend(wordNumber[word] for word in lists[key])
+    listOffsets.append(len(wordNums))
+
+  wordBytes = "".join(words).encode("ascii")
+  keyBlob = b"".join(keys)
+
+  # write then rename so that an interrupted write is never loaded
+  with open(cacheFile + ".tmp", "wb") as f:
+    f.write(struct.pack("<5Q", len(words), length, len(keys), len(keyBlob), len(wordNums)))
+    f.write(wordBytes + padding(len(wordBytes)))
+    keyOffsets.tofile(f)
+    f.write(keyBlob + padding(len(keyBlob)))
+    listOffsets.tofile(f)
+    wordNums.tofile(f)
+  os.replace(cacheFile + ".tmp", cacheFile)
+
+
+
+class MappedIndex:
+
+  def __init__(self, cacheFile):
+
+    with open(cacheFile, "rb") as f:
+      self.map = mmap(f.fileno(), 0, access=ACCESS_READ)
+    numWords, length, self.numKeys, numKeyBytes, numWordNums = struct.unpack_from("<5Q", self.map)
+
+    start = 40
+    text = self.map[start : start + numWords*length].decode("ascii")
+    self.words = [text[i : i+length] for i in range(0, len(text), length)]
+    start += numWords*length + len(padding(numWords*length))
+
+    view = memoryview(self.map)
+    self.keyOffsets = view[start : start + 4*(self.numKeys + 1)].cast("I")
+    start += 4*(self.numKeys + 1)
+    self.keysStart = start
+    start += numKeyBytes + len(padding(numKeyBytes))
+    self.listOffsets = view[start : start + 4*(self.numKeys + 1)].cast("I")
+    start += 4*(self.numKeys + 1)
+    self.wordNums = view[start : start + 4*numWordNums].cast("I")
+
+    self.lists = {}     # {key: list of words (or None if not a key)} for keys already looked up
+    self.numbers = {}   # {key: word numbers} for keys already looked up by get_numbers()
+
+
+  def __len__(self):
+    return self.numKeys
+
+
+  def get(self, key, default=None):
+    try:
+      words = self.lists[key]
+    except KeyError:
+      row = self.find(key)
+      words = self.lists[key] = None if row < 0 else [self.words[i] for i in self.row_numbers(row)]
+    return default if words is None else words
+
+
+  # Like get(), but returns the numbers of the words (their indices in self.words)
+  #   as a read-only view of the mapped file (or an empty tuple if key is not a key).
+  def get_numbers(self, key):
+    try:
+      return self.numbers[key]
+    except KeyError:
+      row = self.find(key)
+      numbers = self.numbers[key] = () if row < 0 else self.row_numbers(row)
+      return numbers
+
+
+  def row_numbers(self, row):
+    return self.wordNums[self.listOffsets[row] : self.listOffsets[row + 1]]
+
+
+  # the row of a key (binary search of the sorted keys), or -1 if not a key
+  def find(self, key):
+    target = key_bytes(key)
+    keyOffsets = self.keyOffsets
+    start = self.keysStart
+
+    low = 0
+    high = self.numKeys
+    while low < high:
+      middle = (low + high) // 2
+      if self.map[start + keyOffsets[middle] : start + keyOffsets[middle + 1]] < target:
+        low = middle + 1
+      else:
+        high = middle
+
+    if low == self.numKeys or self.map[start + keyOffsets[low] : start + keyOffsets[low + 1]] != target:
+      return -1
+    return low